@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ChatMessage, SharedFile
+from .models import ChatArchive, ChatMessage, FileBlob, FileUpload, SharedFile
 
 
 @admin.register(ChatMessage)
@@ -14,9 +14,34 @@ class ChatMessageAdmin(admin.ModelAdmin):
     message_preview.short_description = 'Message'
 
 
+@admin.register(ChatArchive)
+class ChatArchiveAdmin(admin.ModelAdmin):
+    list_display = ('meeting', 'message_count', 'compression', 'first_created_at', 'last_created_at', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('meeting__title',)
+    exclude = ('data',)
+    ordering = ('-created_at',)
+
+
 @admin.register(SharedFile)
 class SharedFileAdmin(admin.ModelAdmin):
     list_display = ('filename', 'uploaded_by', 'meeting', 'file_size', 'uploaded_at')
     list_filter = ('uploaded_at',)
     search_fields = ('filename', 'uploaded_by__email', 'meeting__title')
     ordering = ('-uploaded_at',)
+
+
+@admin.register(FileUpload)
+class FileUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'uploaded_by', 'meeting', 'offset', 'file_size', 'updated_at')
+    list_filter = ('created_at',)
+    search_fields = ('filename', 'uploaded_by__email', 'meeting__title')
+    ordering = ('-created_at',)
+
+
+@admin.register(FileBlob)
+class FileBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
+    search_fields = ('sha256',)
+    readonly_fields = ('sha256', 'file', 'size', 'ref_count', 'created_at')
+    ordering = ('-created_at',)
@@ -0,0 +1,166 @@
+"""
+Cold storage for the chat history of old meetings.
+
+The archive_chat command moves the messages of completed meetings older
+than CHAT_ARCHIVE_AFTER_DAYS out of the ChatMessage table into ChatArchive
+rows: one compressed blob of JSON lines per run and meeting (zstd when the
+zstandard package is installed, zlib otherwise). get_messages reads archived
+messages back through the same cursors as live ones, so clients cannot tell
+the difference. Archived messages are not covered by full-text search.
+
+Archives are taken of a meeting's whole hot history at once, so every
+archived message of a meeting is older than its remaining ChatMessage rows.
+Archives are read by decompressing them block by block, so only the
+compressed data and one block of messages are held in memory at a time.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from collections import deque
+import io
+import json
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional, zlib is used instead
+    zstandard = None
+
+from .models import ChatArchive, ChatMessage
+
+User = get_user_model()
+
+# Decompressed bytes produced per step when reading an archive
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def compress(data):
+    """Return (compression, blob) using the best available codec"""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'zlib', zlib.compress(data, 9)
+
+
+def decompress(compression, blob):
+    """Yield the decompressed data in blocks of at most READ_BLOCK_SIZE bytes"""
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('The zstandard package is required to read zstd chat archives')
+        yield from zstandard.ZstdDecompressor().read_to_iter(io.BytesIO(blob), write_size=READ_BLOCK_SIZE)
+    elif compression == 'zlib':
+        decompressor = zlib.decompressobj()
+        block = decompressor.decompress(blob, READ_BLOCK_SIZE)
+        while block:
+            yield block
+            block = decompressor.decompress(decompressor.unconsumed_tail, READ_BLOCK_SIZE)
+    else:
+        raise ValueError(f'Unknown chat archive compression {compression!r}')
+
+
+def archive_meeting(meeting_id):
+    """
+    Move every message of a meeting into a new ChatArchive.
+    Returns the archive, or None if the meeting has no messages.
+    """
+    with transaction.atomic():
+        messages = list(
+            ChatMessage.objects.filter(meeting_id=meeting_id)
+            .order_by('created_at', 'id')
+            .values('id', 'uuid', 'sender_id', 'message', 'created_at')
+            .select_for_update()
+        )
+        if not messages:
+            return None
+
+        lines = b''.join(
+            json.dumps({
+                'id': message['id'],
+                'uuid': str(message['uuid']),
+                'sender_id': message['sender_id'],
+                'message': message['message'],
+                'created_at': message['created_at'].isoformat(),
+            }).encode() + b'\n'
+            for message in messages
+        )
+        compression, data = compress(lines)
+        archive = ChatArchive.objects.create(
+            meeting_id=meeting_id,
+            compression=compression,
+            data=data,
+            message_count=len(messages),
+            first_message_id=messages[0]['id'],
+            first_created_at=messages[0]['created_at'],
+            last_message_id=messages[-1]['id'],
+            last_created_at=messages[-1]['created_at'],
+        )
+        deleted, _ = ChatMessage.objects.filter(
+            meeting_id=meeting_id, id__lte=max(message['id'] for message in messages)
+        ).delete()
+        if deleted != len(messages):
+            # A message arrived while archiving; roll back and retry next run
+            raise RuntimeError(f'Chat of meeting {meeting_id} changed while it was being archived')
+    return archive
+
+
+def archived_messages(archive):
+    """Yield an archive's messages as (created_at, id, sender_id, message, uuid) tuples, oldest first"""
+    archive = ChatArchive.objects.only('compression', 'data').get(id=archive.id)
+    rest = b''
+    for block in decompress(archive.compression, archive.data):
+        lines = (rest + block).split(b'\n')
+        rest = lines.pop()
+        for entry in map(json.loads, lines):
+            # Messages archived before they had a uuid have none
+            yield parse_datetime(entry['created_at']), entry['id'], entry['sender_id'], entry['message'], entry.get('uuid')
+
+
+def archived_after(archives, position, limit):
+    """Up to `limit` archived entries after a (created_at, id) position, oldest first"""
+    entries = []
+    for archive in archives:
+        if (archive.last_created_at, archive.last_message_id) <= position:
+            continue
+        for entry in archived_messages(archive):
+            if entry[:2] > position:
+                entries.append(entry)
+                if len(entries) >= limit:
+                    return entries
+    return entries
+
+
+def archived_before(archives, position, limit):
+    """
+    Up to `limit` archived entries before a (created_at, id) position (or the
+    newest ones if it is None), newest first.
+    """
+    entries = []
+    for archive in reversed(archives):
+        if position is not None and (archive.first_created_at, archive.first_message_id) >= position:
+            continue
+        # The last entries before the position
+        before = deque(maxlen=limit - len(entries))
+        for entry in archived_messages(archive):
+            if position is not None and entry[:2] >= position:
+                break
+            before.append(entry)
+        entries.extend(reversed(before))
+        if len(entries) >= limit:
+            break
+    return entries
+
+
+def to_chat_messages(meeting_id, entries):
+    """
+    Turn archived entries into unsaved ChatMessage instances with their
+    senders attached. Messages of deleted users are dropped, as they would
+    have been by the cascade.
+    """
+    senders = User.objects.in_bulk({entry[2] for entry in entries})
+    return [
+        ChatMessage(
+            id=pk, uuid=uuid, meeting_id=meeting_id, sender=senders[sender_id], message=message, created_at=created_at
+        )
+        for created_at, pk, sender_id, message, uuid in entries
+        if sender_id in senders
+    ]
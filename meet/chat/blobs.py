@@ -0,0 +1,108 @@
+"""
+Content-addressed storage for shared files.
+
+Uploaded content is hashed and stored once as a FileBlob at
+blobs/<first two hex digits>/<sha256>; every SharedFile with the same
+content points its `file` at that blob. Blobs and thumbnails are not served
+from MEDIA_URL (PRIVATE_MEDIA_DIRS), only by the access-checked download
+views, so their predictable names give nothing away. FileBlob.ref_count counts the
+SharedFile rows using a blob. It is taken by share_blob() and released by
+the SharedFile post_delete receiver, and the blob, its file and its
+thumbnail are deleted together with the last reference.
+
+A client starting a resumable upload may announce the file's SHA-256; if
+the content is already shared in a meeting the user can access, the file is
+shared at once and no bytes are sent. Content only shared elsewhere must be
+uploaded, so a hash neither reveals whether other meetings have a file nor
+stands in for having it.
+
+A blob file is stored before its row is committed. Callers storing content
+inside a transaction delete the file again (see discard_stored) if the
+transaction fails, as the row it belonged to was rolled back.
+"""
+
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+import os
+
+from .models import FileBlob, SharedFile
+from .thumbnails import thumbnail_name
+
+# Attempts at taking a reference while another request stores or frees the same content
+ACQUIRE_ATTEMPTS = 3
+
+
+def blob_name(sha256):
+    return os.path.join('blobs', sha256[:2], sha256)
+
+
+def acquire_blob(sha256, size, content=None):
+    """
+    Take a reference to the blob with this content, storing `content` (a
+    File) first if the content is new. Returns (blob, stored), stored
+    telling whether the content was stored by this call, or (None, False)
+    if it is not stored and no content was given.
+    """
+    for _ in range(ACQUIRE_ATTEMPTS):
+        blob = FileBlob.objects.filter(sha256=sha256, size=size).first()
+        if blob is not None:
+            # Fails if the last reference was released meanwhile
+            if FileBlob.objects.filter(pk=blob.pk, ref_count__gt=0).update(ref_count=F('ref_count') + 1):
+                return blob, False
+            continue
+        if content is None:
+            return None, False
+        name = default_storage.save(blob_name(sha256), content)
+        try:
+            with transaction.atomic():
+                return FileBlob.objects.create(sha256=sha256, size=size, file=name, ref_count=1), True
+        except IntegrityError:
+            # Stored by a concurrent upload of the same content
+            default_storage.delete(name)
+    raise RuntimeError(f'Could not take a reference to blob {sha256}')
+
+
+def discard_stored(blob):
+    """Delete the file of a blob whose creation was rolled back"""
+    default_storage.delete(blob.file.name)
+
+
+def is_shared_in(sha256, size, meetings):
+    """Whether content is already shared in one of `meetings` (a queryset)"""
+    return SharedFile.objects.filter(blob__sha256=sha256, blob__size=size, meeting__in=meetings).exists()
+
+
+def share_blob(blob, meeting_id, uploaded_by_id, filename):
+    """Create a SharedFile for a blob the caller holds a reference to"""
+    return SharedFile.objects.create(
+        meeting_id=meeting_id,
+        uploaded_by_id=uploaded_by_id,
+        blob=blob,
+        file=blob.file.name,
+        filename=filename,
+        file_size=blob.size,
+        content_hash=blob.sha256
+    )
+
+
+def release_blob(blob_id):
+    """Drop a reference to a blob, deleting the blob and its file with the last one"""
+    with transaction.atomic():
+        FileBlob.objects.filter(pk=blob_id).update(ref_count=F('ref_count') - 1)
+        blob = FileBlob.objects.filter(pk=blob_id, ref_count__lte=0).first()
+        if blob is not None:
+            blob.delete()
+            transaction.on_commit(lambda: delete_files(blob))
+
+
+def delete_files(blob):
+    default_storage.delete(blob.file.name)
+    delete_unused_thumbnail(blob.sha256)
+
+
+def delete_unused_thumbnail(sha256):
+    """Delete the thumbnail of some content once no SharedFile has that content"""
+    # Files shared before deduplication may have the same content without a blob
+    if not SharedFile.objects.filter(content_hash=sha256).exists():
+        default_storage.delete(thumbnail_name(sha256))
@@ -0,0 +1,197 @@
+"""
+Shared file download responses.
+
+Shared files live in MEDIA_ROOT but are never served from MEDIA_URL (see
+PRIVATE_MEDIA_DIRS); their `file_url` is download_file. It only checks
+that the user may see the file; how the bytes are sent depends on
+FILE_DOWNLOAD_MODE:
+
+    'python'            streamed by Django (development)
+    'x-accel-redirect'  handed to nginx, which serves the file from an
+                        internal location at FILE_DOWNLOAD_ACCEL_PREFIX
+                        aliasing MEDIA_ROOT (see nginx.conf)
+    'x-sendfile'        handed to Apache mod_xsendfile or lighttpd by path
+
+With the last two the worker is free as soon as the headers are written,
+however large the file is. download_thumbnail sends thumbnails the same way.
+
+Every response carries a strong ETag (the SHA-256 stored on SharedFile)
+and Last-Modified, so If-None-Match / If-Modified-Since are answered with
+304 here, before any mode. Files shared before content hashes were stored
+only have Last-Modified until the hash_files command has hashed them.
+
+Byte ranges (Range, If-Range) are served here in 'python' mode, single
+ranges as 206 and several as multipart/byteranges; the web server serves
+them itself in the other modes.
+"""
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from urllib.parse import quote
+import mimetypes
+import secrets
+
+
+# More ranges than this in one request are answered with the whole file
+MAX_RANGES = 16
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Parse a Range header into a sorted list of inclusive (start, end) byte
+    positions within a file of `size` bytes, overlapping and adjacent ranges
+    merged (RFC 7233 section 6.1). Returns None if the header is absent,
+    malformed, asks for too many ranges or for more bytes than the file has
+    (the whole file is sent), and an empty list if no range is satisfiable
+    (416).
+    """
+    unit, _, specs = header.partition('=')
+    if unit.strip().lower() != 'bytes' or not specs:
+        return None
+    ranges = []
+    for spec in specs.split(','):
+        start, dash, end = spec.strip().partition('-')
+        if not dash or not (start or end) or not (start or '0').isdigit() or not (end or '0').isdigit():
+            return None
+        if not start:
+            # Suffix range: the last `end` bytes
+            if int(end) and size:
+                ranges.append((max(0, size - int(end)), size - 1))
+            continue
+        if end and int(end) < int(start):
+            return None
+        if int(start) < size:
+            ranges.append((int(start), min(int(end), size - 1) if end else size - 1))
+    if len(ranges) > MAX_RANGES or sum(end - start + 1 for start, end in ranges) > size:
+        return None
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def if_range_passes(request, etag, last_modified):
+    """Whether a Range request may be honoured given its If-Range validator"""
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        # Only strong ETags match
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def read_range(path, start, end):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining:
+            block = f.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+
+
+def range_response(shared_file, ranges, content_type):
+    """206 response for one or several byte ranges of a file"""
+    path, size = shared_file.file.path, shared_file.file_size
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        response = StreamingHttpResponse(read_range(path, start, end), status=206, content_type=content_type)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+        return response
+
+    boundary = secrets.token_hex(16)
+    heads = [
+        (
+            f'--{boundary}\r\nContent-Type: {content_type}\r\n'
+            f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n'
+        ).encode()
+        for start, end in ranges
+    ]
+    tail = f'--{boundary}--\r\n'.encode()
+
+    def parts():
+        for head, (start, end) in zip(heads, ranges):
+            yield head
+            yield from read_range(path, start, end)
+            yield b'\r\n'
+        yield tail
+
+    response = StreamingHttpResponse(
+        parts(), status=206, content_type=f'multipart/byteranges; boundary={boundary}'
+    )
+    response['Content-Length'] = (
+        sum(len(head) + end - start + 1 + 2 for head, (start, end) in zip(heads, ranges)) + len(tail)
+    )
+    return response
+
+
+def offload_response(file, content_type):
+    """Empty response handing the stored `file` to the web server to send"""
+    response = HttpResponse(content_type=content_type)
+    if settings.FILE_DOWNLOAD_MODE == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = quote(settings.FILE_DOWNLOAD_ACCEL_PREFIX + file.name)
+    else:
+        response['X-Sendfile'] = file.path
+    return response
+
+
+def file_response(request, shared_file):
+    """Build the download response for a SharedFile whose file exists"""
+    etag = quote_etag(shared_file.content_hash) if shared_file.content_hash else None
+    last_modified = int(shared_file.uploaded_at.timestamp())
+    content_type = mimetypes.guess_type(shared_file.filename)[0] or 'application/octet-stream'
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        mode = settings.FILE_DOWNLOAD_MODE
+        range_header = request.META.get('HTTP_RANGE')
+        ranges = None
+        if mode not in ('x-accel-redirect', 'x-sendfile') and range_header and if_range_passes(
+            request, etag, last_modified
+        ):
+            ranges = parse_range(range_header, shared_file.file_size)
+
+        if mode in ('x-accel-redirect', 'x-sendfile'):
+            response = offload_response(shared_file.file, content_type)
+        elif ranges == []:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{shared_file.file_size}'
+        elif ranges:
+            response = range_response(shared_file, ranges, content_type)
+        else:
+            response = FileResponse(open(shared_file.file.path, 'rb'), content_type=content_type)
+        # filename*= keeps non-ASCII and quoted names intact
+        response['Content-Disposition'] = content_disposition_header(True, shared_file.filename)
+        response['Accept-Ranges'] = 'bytes'
+
+    if etag:
+        response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Access is checked on every request: caches must revalidate
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def thumbnail_response(request, shared_file):
+    """Build the response for the thumbnail of a SharedFile, which exists"""
+    # Thumbnails are keyed by content, so the content hash validates them too
+    etag = quote_etag(f'{shared_file.content_hash}-thumbnail')
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if settings.FILE_DOWNLOAD_MODE in ('x-accel-redirect', 'x-sendfile'):
+            response = offload_response(shared_file.thumbnail, 'image/jpeg')
+        else:
+            response = FileResponse(open(shared_file.thumbnail.path, 'rb'), content_type='image/jpeg')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
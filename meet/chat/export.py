@@ -0,0 +1,96 @@
+"""
+Streaming chat export.
+
+Rows are produced lazily, archived history first (see chat.archive), then
+the live ChatMessage table read with .iterator(chunk_size=...), so memory
+stays constant however long the meeting's history is.
+
+Under ASGI, StreamingHttpResponse would read a sync iterator to the end
+before sending anything, so the response gets ablocks() instead: an async
+iterator producing each block on the sync thread, where the database may be
+used.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from itertools import islice
+import csv
+import json
+
+from .archive import archived_messages
+from .models import ChatArchive, ChatMessage
+
+User = get_user_model()
+
+EXPORT_FIELDS = ('id', 'created_at', 'sender_id', 'sender_email', 'message')
+EXPORT_CHUNK_SIZE = 2000
+# Lines are joined into blocks of about this many characters per write
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def export_rows(meeting_id):
+    """Yield (id, created_at, sender_id, sender_email, message) tuples, oldest first"""
+    for archive in ChatArchive.objects.filter(meeting_id=meeting_id).defer('data'):
+        archived = archived_messages(archive)
+        while entries := list(islice(archived, EXPORT_CHUNK_SIZE)):
+            emails = dict(User.objects.filter(id__in={entry[2] for entry in entries}).values_list('id', 'email'))
+            for created_at, pk, sender_id, message, _ in entries:
+                if sender_id in emails:
+                    yield pk, created_at, sender_id, emails[sender_id], message
+
+    messages = ChatMessage.objects.filter(meeting_id=meeting_id).order_by('created_at', 'id').values_list(
+        'id', 'created_at', 'sender_id', 'sender__email', 'message'
+    )
+    yield from messages.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of buffering it"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_FIELDS)
+    for pk, created_at, sender_id, sender_email, message in rows:
+        yield writer.writerow((pk, created_at.isoformat(), sender_id, sender_email, message))
+
+
+def jsonl_lines(rows):
+    for pk, created_at, sender_id, sender_email, message in rows:
+        yield json.dumps({
+            'id': pk,
+            'created_at': created_at.isoformat(),
+            'sender_id': sender_id,
+            'sender_email': sender_email,
+            'message': message,
+        }) + '\n'
+
+
+def blocks(lines):
+    """Join lines into blocks of about EXPORT_BLOCK_SIZE characters"""
+    block, size = [], 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= EXPORT_BLOCK_SIZE:
+            yield ''.join(block)
+            block, size = [], 0
+    if block:
+        yield ''.join(block)
+
+
+async def ablocks(lines):
+    """Async iterator over blocks(lines), each block produced on the sync thread"""
+    next_block = sync_to_async(next)
+    iterator = blocks(lines)
+    while (block := await next_block(iterator, None)) is not None:
+        yield block
+
+
+EXPORT_FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson'),
+}
@@ -0,0 +1,67 @@
+"""
+Move the chat history of old completed meetings into compressed archives.
+
+Meant to run on a schedule (cron, a systemd timer or Windows Task
+Scheduler), e.g. nightly:
+
+    python manage.py archive_chat
+    python manage.py archive_chat --days 90 --dry-run
+"""
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+
+from chat.archive import archive_meeting
+from meetings.models import Meeting
+
+
+class Command(BaseCommand):
+    help = 'Compress the chat messages of old completed meetings into per-meeting archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Archive meetings scheduled more than this many days ago (default: CHAT_ARCHIVE_AFTER_DAYS)'
+        )
+        parser.add_argument('--limit', type=int, default=None, help='Archive at most this many meetings')
+        parser.add_argument('--dry-run', action='store_true', help='Only list the meetings that would be archived')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else settings.CHAT_ARCHIVE_AFTER_DAYS
+        cutoff = timezone.now() - timedelta(days=days)
+        meetings = Meeting.objects.filter(
+            status='completed', scheduled_at__lt=cutoff, chat_messages__isnull=False
+        ).distinct().order_by('scheduled_at').values_list('id', flat=True)
+        if options['limit']:
+            meetings = meetings[:options['limit']]
+
+        archived = messages = archive_bytes = failed = 0
+        for meeting_id in meetings:
+            if options['dry_run']:
+                self.stdout.write(f'Would archive meeting {meeting_id}')
+                continue
+            try:
+                archive = archive_meeting(meeting_id)
+            except RuntimeError as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(str(e)))
+                continue
+            if archive is None:
+                continue
+            archived += 1
+            messages += archive.message_count
+            archive_bytes += len(archive.data)
+            self.stdout.write(
+                f'Archived {archive.message_count} messages of meeting {meeting_id} '
+                f'({len(archive.data)} bytes, {archive.compression})'
+            )
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Archived {messages} messages from {archived} meetings into {archive_bytes} bytes'
+                + (f', {failed} meetings changed during archiving and were skipped' if failed else '')
+            ))
@@ -0,0 +1,53 @@
+"""
+Remove resumable uploads that were never finished.
+
+Meant to run on a schedule next to archive_chat, e.g. hourly:
+
+    python manage.py clean_uploads
+    python manage.py clean_uploads --hours 6
+"""
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.utils import timezone
+from datetime import timedelta
+import os
+
+from chat.models import FileUpload
+from chat.uploads import PART_DIR, discard_upload
+
+
+class Command(BaseCommand):
+    help = 'Delete unfinished file uploads and their partial data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=None,
+            help='Delete uploads untouched for this many hours (default: UPLOAD_EXPIRE_HOURS)'
+        )
+
+    def handle(self, *args, **options):
+        hours = options['hours'] if options['hours'] is not None else settings.UPLOAD_EXPIRE_HOURS
+        cutoff = timezone.now() - timedelta(hours=hours)
+
+        expired = 0
+        for upload in FileUpload.objects.filter(updated_at__lt=cutoff):
+            discard_upload(upload)
+            expired += 1
+
+        # Part files left behind by uploads deleted with their meeting
+        orphans = 0
+        part_dir = os.path.join(settings.MEDIA_ROOT, PART_DIR)
+        if os.path.isdir(part_dir):
+            known = {str(upload_id) for upload_id in FileUpload.objects.values_list('id', flat=True)}
+            for name in os.listdir(part_dir):
+                path = os.path.join(part_dir, name)
+                if os.path.splitext(name)[0] not in known and os.path.getmtime(path) < cutoff.timestamp():
+                    os.remove(path)
+                    orphans += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Removed {expired} expired uploads and {orphans} orphaned part files'
+        ))
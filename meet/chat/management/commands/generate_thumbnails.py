@@ -0,0 +1,60 @@
+"""
+Render the thumbnails shared files are missing.
+
+Fills in files shared before thumbnails existed, and jobs lost when a
+process exited with its in-process thumbnail queue still full:
+
+    python manage.py generate_thumbnails
+    python manage.py generate_thumbnails --workers 8
+"""
+
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from concurrent.futures import as_completed
+
+from chat.models import SharedFile, file_sha256
+from chat.previews import IMAGE_EXTENSIONS, PDF_EXTENSIONS, render_thumbnail
+from chat.thumbnails import make_pool, render_job, store_thumbnail
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails of shared images and PDFs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Render processes (default: THUMBNAIL_WORKERS, at least 1)'
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'] or settings.THUMBNAIL_WORKERS)
+        extensions = IMAGE_EXTENSIONS + PDF_EXTENSIONS
+        jobs = {}
+        for shared_file in SharedFile.objects.filter(thumbnail='').iterator():
+            if not shared_file.filename.lower().endswith(extensions):
+                continue
+            if not shared_file.content_hash:
+                shared_file.content_hash = file_sha256(shared_file.file)
+                shared_file.file.close()
+                SharedFile.objects.filter(pk=shared_file.pk).update(content_hash=shared_file.content_hash)
+            job = render_job(shared_file)
+            # Content with a thumbnail already stored only needs linking
+            if job and shared_file.content_hash not in jobs and not store_thumbnail(shared_file.content_hash):
+                jobs[shared_file.content_hash] = job
+
+        rendered = failed = 0
+        with make_pool(workers) as pool:
+            futures = {pool.submit(render_thumbnail, *job): sha256 for sha256, job in jobs.items()}
+            for future in as_completed(futures):
+                try:
+                    store_thumbnail(futures[future], future.result())
+                    rendered += 1
+                except Exception as e:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f'Could not render {futures[future]}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rendered {rendered} thumbnails' + (f', {failed} files could not be rendered' if failed else '')
+        ))
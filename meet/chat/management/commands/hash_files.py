@@ -0,0 +1,34 @@
+"""
+Store the content hash of files shared before content hashes existed.
+
+Downloads of those files carry no ETag until they are hashed. Run once
+after upgrading; it only reads files still missing a hash, so it can be
+interrupted and run again:
+
+    python manage.py hash_files
+"""
+
+from django.core.management.base import BaseCommand
+
+from chat.models import SharedFile, file_sha256
+
+
+class Command(BaseCommand):
+    help = 'Store the SHA-256 of shared files that have none'
+
+    def handle(self, *args, **options):
+        hashed = missing = 0
+        for shared_file in SharedFile.objects.filter(content_hash='').only('id', 'file').iterator():
+            try:
+                with shared_file.file.open('rb') as file:
+                    content_hash = file_sha256(file)
+            except FileNotFoundError:
+                missing += 1
+                self.stdout.write(self.style.WARNING(f'File of shared file {shared_file.id} is missing'))
+                continue
+            SharedFile.objects.filter(pk=shared_file.pk).update(content_hash=content_hash)
+            hashed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Hashed {hashed} shared files' + (f', {missing} files are missing' if missing else '')
+        ))
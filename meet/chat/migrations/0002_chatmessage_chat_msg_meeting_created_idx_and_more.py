@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0001_initial'),
+    ]
+
+    # Composite indexes are created before the single-column meeting
+    # indexes they replace are dropped
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['meeting', 'created_at', 'id'], name='chat_msg_meeting_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sharedfile',
+            index=models.Index(fields=['meeting', '-uploaded_at'], name='chat_file_meeting_uploaded_idx'),
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='meeting',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='chat_messages', to='meetings.meeting'),
+        ),
+        migrations.AlterField(
+            model_name='sharedfile',
+            name='meeting',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='shared_files', to='meetings.meeting'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:05
+
+from django.db import migrations
+
+
+# SQLite: an external-content FTS5 table kept in sync by triggers. Note that
+# SQLite table remakes (AlterField on ChatMessage) drop the triggers, so any
+# later migration that remakes chat_chatmessage must recreate them.
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE chat_chatmessage_fts USING fts5(message, content='chat_chatmessage', content_rowid='id')",
+    """CREATE TRIGGER chat_chatmessage_fts_insert AFTER INSERT ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER chat_chatmessage_fts_delete AFTER DELETE ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER chat_chatmessage_fts_update AFTER UPDATE OF message ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_insert",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_delete",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_update",
+    "DROP TABLE IF EXISTS chat_chatmessage_fts",
+]
+
+# PostgreSQL: a GIN index on the message's tsvector, maintained by the database
+POSTGRESQL_CREATE = [
+    "CREATE INDEX chat_msg_search_idx ON chat_chatmessage USING GIN (to_tsvector('simple', message))",
+]
+POSTGRESQL_DROP = [
+    "DROP INDEX IF EXISTS chat_msg_search_idx",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_chatmessage_chat_msg_meeting_created_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_CREATE, 'postgresql': POSTGRESQL_CREATE}),
+            run({'sqlite': SQLITE_DROP, 'postgresql': POSTGRESQL_DROP}),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0003_alter_meetingparticipant_meeting'),
+        ('chat', '0003_chatmessage_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('compression', models.CharField(max_length=10)),
+                ('data', models.BinaryField()),
+                ('message_count', models.IntegerField()),
+                ('first_message_id', models.BigIntegerField()),
+                ('first_created_at', models.DateTimeField()),
+                ('last_message_id', models.BigIntegerField()),
+                ('last_created_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('meeting', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chat_archives', to='meetings.meeting')),
+            ],
+            options={
+                'ordering': ['last_created_at', 'last_message_id'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0006_fileupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sharedfile',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='SHA-256 of the file content, the download ETag', max_length=64),
+        ),
+    ]
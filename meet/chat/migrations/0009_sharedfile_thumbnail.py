@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0008_fileblob_sharedfile_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sharedfile',
+            name='thumbnail',
+            field=models.FileField(blank=True, upload_to='thumbnails/'),
+        ),
+    ]
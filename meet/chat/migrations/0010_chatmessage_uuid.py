@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:40
+
+from django.db import migrations, models
+import django.utils.timezone
+import uuid
+
+
+# Altering a ChatMessage column remakes chat_chatmessage on SQLite, which drops
+# the full-text search triggers of 0003_chatmessage_search_index. They are
+# recreated, and the index rebuilt, after every remake (forwards and backwards).
+SQLITE_SEARCH_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_insert",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_delete",
+    "DROP TRIGGER IF EXISTS chat_chatmessage_fts_update",
+    """CREATE TRIGGER chat_chatmessage_fts_insert AFTER INSERT ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    """CREATE TRIGGER chat_chatmessage_fts_delete AFTER DELETE ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+    END""",
+    """CREATE TRIGGER chat_chatmessage_fts_update AFTER UPDATE OF message ON chat_chatmessage BEGIN
+        INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts, rowid, message) VALUES ('delete', old.id, old.message);
+        INSERT INTO chat_chatmessage_fts(rowid, message) VALUES (new.id, new.message);
+    END""",
+    "INSERT INTO chat_chatmessage_fts(chat_chatmessage_fts) VALUES ('rebuild')",
+]
+
+
+def restore_search_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for sql in SQLITE_SEARCH_TRIGGERS:
+            schema_editor.execute(sql)
+
+
+def fill_uuids(apps, schema_editor):
+    ChatMessage = apps.get_model('chat', 'ChatMessage')
+    batch = []
+    for message in ChatMessage.objects.filter(uuid__isnull=True).only('id').iterator(chunk_size=2000):
+        message.uuid = uuid.uuid4()
+        batch.append(message)
+        if len(batch) == 2000:
+            ChatMessage.objects.bulk_update(batch, ['uuid'])
+            batch = []
+    ChatMessage.objects.bulk_update(batch, ['uuid'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0009_sharedfile_thumbnail'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AddField(
+            model_name='chatmessage',
+            name='uuid',
+            field=models.UUIDField(editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(fill_uuids, migrations.RunPython.noop),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
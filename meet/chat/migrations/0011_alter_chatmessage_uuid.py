@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 23:40
+
+from django.db import migrations, models
+from importlib import import_module
+import uuid
+
+# chat_chatmessage is remade again, see 0010_chatmessage_uuid
+restore_search_triggers = import_module('chat.migrations.0010_chatmessage_uuid').restore_search_triggers
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0010_chatmessage_uuid'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, restore_search_triggers),
+        migrations.AlterField(
+            model_name='chatmessage',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, unique=True),
+        ),
+        migrations.RunPython(restore_search_triggers, migrations.RunPython.noop),
+    ]
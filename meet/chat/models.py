@@ -1,27 +1,100 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+import hashlib
 import os
+import uuid
 
 User = get_user_model()
 
 
+def file_sha256(file):
+    """Hex SHA-256 of a file's content, read in chunks"""
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
 class ChatMessage(models.Model):
-    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='chat_messages')
+    # Indexed by chat_msg_meeting_created_idx, which leads with meeting
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='chat_messages', db_index=False)
     sender = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sent_messages')
     message = models.TextField()
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set before a socket message is broadcast, so the frame and the row agree
+    uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            # Chat history pages: meeting filter + (created_at, id) keyset
+            models.Index(fields=['meeting', 'created_at', 'id'], name='chat_msg_meeting_created_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.email}: {self.message[:30]}"
 
 
+class ChatArchive(models.Model):
+    """
+    Compressed JSON lines of a meeting's chat messages moved out of
+    ChatMessage by the archive_chat command (see chat.archive).
+    """
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='chat_archives')
+    compression = models.CharField(max_length=10)
+    data = models.BinaryField()
+    message_count = models.IntegerField()
+    first_message_id = models.BigIntegerField()
+    first_created_at = models.DateTimeField()
+    last_message_id = models.BigIntegerField()
+    last_created_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['last_created_at', 'last_message_id']
+    
+    def __str__(self):
+        return f"{self.message_count} archived messages - {self.meeting_id}"
+
+
+class ChatReadCursor(models.Model):
+    """Position of the last chat message a user has read in a meeting"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='chat_read_cursors')
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='chat_read_cursors')
+    last_read_at = models.DateTimeField()
+    last_read_message_id = models.BigIntegerField()
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ('user', 'meeting')
+    
+    def __str__(self):
+        return f"{self.user_id} read meeting {self.meeting_id} up to {self.last_read_message_id}"
+
+
+class FileBlob(models.Model):
+    """
+    Content of shared files, stored once per distinct content under its
+    SHA-256 and referenced by every SharedFile with that content (see chat.blobs)
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to='blobs/')
+    size = models.BigIntegerField(help_text='File size in bytes')
+    ref_count = models.IntegerField(default=0, help_text='SharedFile rows using this blob')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.sha256} ({self.ref_count} references)"
+
+
 class SharedFile(models.Model):
-    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='shared_files')
+    # Indexed by chat_file_meeting_uploaded_idx, which leads with meeting
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='shared_files', db_index=False)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='uploaded_files')
+    # Files shared before deduplication have no blob and their own copy in `file`
+    blob = models.ForeignKey(FileBlob, on_delete=models.PROTECT, related_name='shared_files', null=True, blank=True)
     file = models.FileField(
         upload_to='meeting_files/',
         validators=[
@@ -32,16 +105,43 @@ class SharedFile(models.Model):
     )
     filename = models.CharField(max_length=255)
     file_size = models.IntegerField(help_text='File size in bytes')
+    content_hash = models.CharField(max_length=64, blank=True, help_text='SHA-256 of the file content, the download ETag')
+    # Shared by all files with the same content, see chat.thumbnails
+    thumbnail = models.FileField(upload_to='thumbnails/', blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['meeting', '-uploaded_at'], name='chat_file_meeting_uploaded_idx'),
+        ]
     
     def __str__(self):
         return f"{self.filename} - {self.meeting.title}"
     
     def save(self, *args, **kwargs):
         if self.file:
-            self.filename = os.path.basename(self.file.name)
+            if not self.filename:
+                self.filename = os.path.basename(self.file.name)
             self.file_size = self.file.size
+            if not self.content_hash:
+                self.content_hash = file_sha256(self.file)
         super().save(*args, **kwargs)
+
+
+class FileUpload(models.Model):
+    """A resumable upload in progress, turned into a SharedFile when complete (see chat.uploads)"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    meeting = models.ForeignKey('meetings.Meeting', on_delete=models.CASCADE, related_name='file_uploads')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='file_uploads')
+    filename = models.CharField(max_length=255)
+    file_size = models.BigIntegerField(help_text='Announced file size in bytes')
+    offset = models.BigIntegerField(default=0, help_text='Bytes received so far')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.file_size}) - {self.meeting_id}"
@@ -0,0 +1,108 @@
+"""
+Keyset pagination for meeting chat history.
+
+Messages are ordered by (created_at, id) and pages are addressed by an opaque
+cursor encoding the position of a message, so a page costs an index range
+scan no matter how deep into the history it is. Without a cursor the latest
+page is returned; `before=<cursor>` scrolls back through older messages and
+`after=<cursor>` returns only messages newer than the client's last seen one.
+Pages continue seamlessly into archived history (see chat.archive).
+"""
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+import base64
+import binascii
+
+from .archive import archived_after, archived_before, to_chat_messages
+
+
+def encode_cursor(message):
+    """Return the opaque cursor pointing at a message"""
+    position = f'{message.created_at.isoformat()}|{message.pk}'
+    return base64.urlsafe_b64encode(position.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (created_at, id) a cursor points at, or raise ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        created_at, pk = parse_datetime(created_at), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        created_at = None
+    if created_at is None:
+        raise ValueError('Invalid cursor.')
+    return created_at, pk
+
+
+class MessageCursorPagination(BasePagination):
+    """
+    Paginates a ChatMessage queryset on (created_at, id). Pages are always
+    returned oldest first; `has_more` tells whether more messages exist in
+    the direction that was requested. Raises ValueError for a malformed
+    cursor or limit.
+    """
+
+    page_size_query_param = 'limit'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.CHAT_HISTORY_PAGE_SIZE))
+        except ValueError:
+            raise ValueError('limit must be an integer.')
+        return max(1, min(page_size, settings.CHAT_HISTORY_MAX_PAGE_SIZE))
+
+    def paginate_queryset(self, queryset, request, view=None, archives=()):
+        """
+        Return the requested page. `archives` are the meeting's ChatArchive
+        rows (without their data), oldest first; archived messages precede
+        every row of the queryset and are read only when a page reaches them.
+        """
+        page_size = self.get_page_size(request)
+        after = request.query_params.get('after')
+        before = request.query_params.get('before')
+        self.after_mode = bool(after)
+
+        if after:
+            created_at, pk = decode_cursor(after)
+            rows = self.from_archives(archived_after(archives, (created_at, pk), page_size + 1), archives)
+            if len(rows) <= page_size:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                ).order_by('created_at', 'id')
+                rows += list(queryset[:page_size + 1 - len(rows)])
+            self.has_more = len(rows) > page_size
+            page = rows[:page_size]
+        else:
+            position = None
+            if before:
+                position = created_at, pk = decode_cursor(before)
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+            rows = list(queryset.order_by('-created_at', '-id')[:page_size + 1])
+            if len(rows) <= page_size and archives:
+                rows += self.from_archives(archived_before(archives, position, page_size + 1 - len(rows)), archives)
+            self.has_more = len(rows) > page_size
+            page = rows[:page_size][::-1]
+
+        # An empty `after` page keeps the client's cursor for the next poll
+        self.next_cursor = encode_cursor(page[-1]) if page else after
+        self.previous_cursor = encode_cursor(page[0]) if page and not self.after_mode and self.has_more else None
+        return page
+
+    @staticmethod
+    def from_archives(entries, archives):
+        return to_chat_messages(archives[0].meeting_id, entries) if entries else []
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next_cursor': self.next_cursor,
+            'previous_cursor': self.previous_cursor,
+            'has_more': self.has_more,
+            'results': data,
+        })
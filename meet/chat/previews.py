@@ -0,0 +1,74 @@
+"""
+Thumbnail rendering, run in the worker processes of chat.thumbnails.
+
+Deliberately free of Django imports so spawned workers start quickly:
+everything a render needs is passed in, and the JPEG comes back as bytes.
+PDF first pages are rendered with pypdfium2 when it is installed; without
+it PDFs get no preview. Images of more than `max_pixels` pixels are refused
+before they are decoded, so a small file cannot make a worker decode a
+huge image.
+"""
+
+from PIL import Image
+import io
+import warnings
+
+try:
+    import pypdfium2
+except ImportError:  # pragma: no cover - optional, PDFs get no preview
+    pypdfium2 = None
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+PDF_EXTENSIONS = ('.pdf',)
+JPEG_QUALITY = 80
+
+
+def preview_kind(filename):
+    """'image', 'pdf' or None if no preview can be made for this file"""
+    name = filename.lower()
+    if name.endswith(IMAGE_EXTENSIONS):
+        return 'image'
+    if name.endswith(PDF_EXTENSIONS) and pypdfium2 is not None:
+        return 'pdf'
+    return None
+
+
+def first_pdf_page(path, size):
+    pdf = pypdfium2.PdfDocument(path)
+    try:
+        page = pdf[0]
+        width, height = page.get_size()
+        # Render just large enough for the thumbnail
+        return page.render(scale=size / max(width, height, 1)).to_pil()
+    finally:
+        pdf.close()
+
+
+def limit_image_pixels(max_pixels):
+    """Worker process initializer: make Pillow refuse any image above max_pixels"""
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    # Pillow only warns up to twice the limit
+    warnings.simplefilter('error', Image.DecompressionBombWarning)
+
+
+def render_thumbnail(path, kind, size, max_pixels):
+    """Return a JPEG of at most size x size pixels previewing the file at `path`"""
+    if kind == 'pdf':
+        image = first_pdf_page(path, size)
+    else:
+        image = Image.open(path)
+        if image.width * image.height > max_pixels:
+            raise ValueError(f'Image of {image.width}x{image.height} pixels is too large to preview')
+        # Decode at a reduced scale where the format allows (JPEG)
+        image.draft('RGB', (size, size))
+    image.thumbnail((size, size))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    return output.getvalue()
@@ -0,0 +1,55 @@
+"""
+Full-text search over chat messages.
+
+Backed by the inverted index created in chat migration 0003: an FTS5 table
+kept in sync by triggers on SQLite, a GIN index on to_tsvector('simple',
+message) on PostgreSQL. Both are maintained by the database on every
+insert, update and delete, including bulk_create. Other databases fall back
+to a case-insensitive substring scan.
+"""
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+import re
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Split a user query into words; punctuation and search operators are dropped"""
+    return WORD_RE.findall(query)
+
+
+def fts5_query(terms):
+    """
+    Build an FTS5 MATCH expression requiring every term, the last one as a
+    prefix so results show up while the user is still typing.
+    """
+    quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def filter_by_search(queryset, query):
+    """
+    Filter a ChatMessage queryset down to messages matching every word of
+    `query`. Returns an empty queryset if the query has no words.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+
+    if connection.vendor == 'sqlite':
+        return queryset.filter(id__in=RawSQL(
+            'SELECT rowid FROM chat_chatmessage_fts WHERE chat_chatmessage_fts MATCH %s',
+            [fts5_query(terms)]
+        ))
+    if connection.vendor == 'postgresql':
+        # Must match the indexed expression for the GIN index to be used
+        return queryset.extra(
+            where=["to_tsvector('simple', chat_chatmessage.message) @@ to_tsquery('simple', %s)"],
+            params=[' & '.join(terms[:-1] + [terms[-1] + ':*'])]
+        )
+    for term in terms:
+        queryset = queryset.filter(message__icontains=term)
+    return queryset
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from django.conf import settings
+from django.urls import reverse
 from .models import ChatMessage, SharedFile
 from users.serializers import UserSerializer
 
@@ -9,8 +11,17 @@ class ChatMessageSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = ChatMessage
-        fields = ('id', 'meeting', 'sender', 'sender_email', 'message', 'created_at')
-        read_only_fields = ('id', 'sender', 'created_at')
+        fields = ('id', 'uuid', 'meeting', 'sender', 'sender_email', 'message', 'created_at')
+        read_only_fields = ('id', 'uuid', 'sender', 'created_at')
+
+
+class ChatMessageSlimSerializer(serializers.ModelSerializer):
+    """Message with only the sender id; senders are sent once in a `users` map"""
+    
+    class Meta:
+        model = ChatMessage
+        fields = ('id', 'uuid', 'meeting', 'sender', 'message', 'created_at')
+        read_only_fields = fields
 
 
 class SendMessageSerializer(serializers.Serializer):
@@ -18,24 +29,68 @@ class SendMessageSerializer(serializers.Serializer):
     message = serializers.CharField(max_length=5000)
 
 
+class BulkSendMessageSerializer(serializers.Serializer):
+    meeting_id = serializers.IntegerField()
+    messages = serializers.ListField(
+        child=serializers.CharField(max_length=5000),
+        allow_empty=False,
+        max_length=settings.CHAT_BULK_MAX_MESSAGES
+    )
+
+
 class SharedFileSerializer(serializers.ModelSerializer):
     uploaded_by = UserSerializer(read_only=True)
     uploaded_by_email = serializers.EmailField(source='uploaded_by.email', read_only=True)
+    # Shared files are not served from MEDIA_URL: both point at download_file
+    file = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = SharedFile
         fields = ('id', 'meeting', 'uploaded_by', 'uploaded_by_email', 
-                  'file', 'file_url', 'filename', 'file_size', 'uploaded_at')
+                  'file', 'file_url', 'thumbnail_url', 'filename', 'file_size', 'uploaded_at')
         read_only_fields = ('id', 'uploaded_by', 'filename', 'file_size', 'uploaded_at')
     
+    def get_file(self, obj):
+        return self.get_file_url(obj)
+    
     def get_file_url(self, obj):
         request = self.context.get('request')
         if obj.file and request:
-            return request.build_absolute_uri(obj.file.url)
+            return request.build_absolute_uri(reverse('download_file', args=[obj.id]))
+        return None
+    
+    def get_thumbnail_url(self, obj):
+        """Small JPEG preview of images and PDFs, None until it has been generated"""
+        request = self.context.get('request')
+        if obj.thumbnail and request:
+            return request.build_absolute_uri(reverse('download_thumbnail', args=[obj.id]))
         return None
 
 
+class SharedFileSlimSerializer(SharedFileSerializer):
+    """Shared file with only the uploader id; uploaders are sent once in a `users` map"""
+    uploaded_by = serializers.PrimaryKeyRelatedField(read_only=True)
+    
+    class Meta(SharedFileSerializer.Meta):
+        fields = ('id', 'meeting', 'uploaded_by', 'file', 'file_url', 'thumbnail_url',
+                  'filename', 'file_size', 'uploaded_at')
+
+
+def serialize_users(users):
+    """Serialize each distinct user once, keyed by id"""
+    unique = {user.id: user for user in users}
+    return {str(user_id): UserSerializer(user).data for user_id, user in unique.items()}
+
+
 class FileUploadSerializer(serializers.Serializer):
     meeting_id = serializers.IntegerField()
     file = serializers.FileField()
+
+
+class StartUploadSerializer(serializers.Serializer):
+    meeting_id = serializers.IntegerField()
+    filename = serializers.CharField(max_length=255)
+    file_size = serializers.IntegerField(min_value=1)
+    sha256 = serializers.RegexField(r'^[0-9a-f]{64}$', required=False, help_text='Lets known content be shared without uploading it')
@@ -0,0 +1,44 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from meetings.versions import bump_version
+
+from .blobs import delete_unused_thumbnail, release_blob
+from .models import ChatMessage, SharedFile
+from .previews import preview_kind
+from .thumbnails import get_thumbnail_pipeline
+
+
+# ChatMessage rows written with bulk_create (realtime.chatlog, send_messages)
+# bump the chat version explicitly. There is deliberately no post_delete
+# receiver for ChatMessage: it would stop the archive's bulk delete from
+# being a single query.
+@receiver(post_save, sender=ChatMessage)
+def bump_chat_version(sender, instance, **kwargs):
+    """A message was sent or edited"""
+    bump_version('chat', instance.meeting_id)
+
+
+@receiver(post_save, sender=SharedFile)
+@receiver(post_delete, sender=SharedFile)
+def bump_files_version(sender, instance, **kwargs):
+    """A file was shared or removed"""
+    bump_version('files', instance.meeting_id)
+
+
+@receiver(post_delete, sender=SharedFile)
+def release_file_blob(sender, instance, **kwargs):
+    """Drop the deleted file's reference to its content"""
+    if instance.blob_id:
+        release_blob(instance.blob_id)
+    elif instance.content_hash:
+        # Files shared before deduplication have no blob to take the thumbnail with it
+        transaction.on_commit(lambda: delete_unused_thumbnail(instance.content_hash))
+
+
+@receiver(post_save, sender=SharedFile)
+def queue_thumbnail(sender, instance, created, **kwargs):
+    """Render a preview of new images and PDFs once the file is committed"""
+    if created and preview_kind(instance.filename):
+        transaction.on_commit(lambda: get_thumbnail_pipeline().enqueue(instance.pk))
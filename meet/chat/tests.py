@@ -0,0 +1,323 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+import hashlib
+import os
+import tempfile
+
+from meetings.models import Meeting, MeetingParticipant
+from realtime.chatlog import ChatLogWriter
+from users.models import User
+
+from .models import ChatMessage, FileBlob, SharedFile
+
+
+class MeetingTestCase(TestCase):
+    """A meeting of four users, requests made as its host"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(email=f'user{i}@example.com', username=f'user{i}', password='password')
+            for i in range(4)
+        ]
+        cls.meeting = Meeting.objects.create(title='Standup', host=cls.users[0], scheduled_at=timezone.now())
+        MeetingParticipant.objects.bulk_create(
+            MeetingParticipant(meeting=cls.meeting, user=user) for user in cls.users[1:]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.users[0])
+
+
+class ListQueryCountTests(MeetingTestCase):
+    """The message and file lists cost the same number of queries however many rows and senders they hold"""
+
+    def add_messages(self, count):
+        ChatMessage.objects.bulk_create(
+            ChatMessage(meeting=self.meeting, sender=self.users[i % len(self.users)], message=f'message {i}')
+            for i in range(count)
+        )
+
+    def add_files(self, count):
+        SharedFile.objects.bulk_create(
+            SharedFile(
+                meeting=self.meeting,
+                uploaded_by=self.users[i % len(self.users)],
+                file=f'meeting_files/file{i}.txt',
+                filename=f'file{i}.txt',
+                file_size=1
+            )
+            for i in range(count)
+        )
+
+    def get(self, name, queries, **params):
+        url = reverse(name, args=[self.meeting.id])
+        with self.assertNumQueries(queries):
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_messages(self):
+        # meeting, access, archives, page
+        self.add_messages(2)
+        self.assertEqual(len(self.get('get_messages', 4)['results']), 2)
+        self.add_messages(40)
+        self.assertEqual(len(self.get('get_messages', 4, limit=30)['results']), 30)
+
+    def test_messages_slim(self):
+        self.add_messages(2)
+        self.get('get_messages', 4, slim=1)
+        self.add_messages(40)
+        data = self.get('get_messages', 4, slim=1, limit=30)
+        self.assertEqual(len(data['results']), 30)
+        self.assertEqual(len(data['users']), len(self.users))
+
+    def test_messages_earlier_page(self):
+        self.add_messages(40)
+        cursor = self.get('get_messages', 4, limit=10)['previous_cursor']
+        self.assertEqual(len(self.get('get_messages', 4, limit=10, before=cursor)['results']), 10)
+
+    def test_files(self):
+        # meeting, access, files
+        self.add_files(2)
+        self.assertEqual(len(self.get('get_files', 3)), 2)
+        self.add_files(40)
+        self.assertEqual(len(self.get('get_files', 3)), 42)
+
+    def test_files_slim(self):
+        self.add_files(2)
+        self.get('get_files', 3, slim=1)
+        self.add_files(40)
+        data = self.get('get_files', 3, slim=1)
+        self.assertEqual(len(data['results']), 42)
+        self.assertEqual(len(data['users']), len(self.users))
+
+
+class ConditionalListTests(MeetingTestCase):
+    """Conditional GETs of the lists are only answered with a cache shared between processes"""
+
+    def test_not_answered_without_shared_cache(self):
+        response = self.client.get(reverse('get_messages', args=[self.meeting.id]))
+        self.assertNotIn('ETag', response)
+
+    def test_answered_with_shared_cache(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        }):
+            url = reverse('get_messages', args=[self.meeting.id])
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            ChatMessage.objects.create(meeting=self.meeting, sender=self.users[1], message='new')
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class SearchTests(MeetingTestCase):
+    """The search index follows messages as they are inserted, edited and deleted"""
+
+    def search(self, query):
+        response = self.client.get(reverse('search_messages'), {'q': query, 'meeting_id': self.meeting.id})
+        self.assertEqual(response.status_code, 200)
+        return [result['message'] for result in response.data['results']]
+
+    def test_insert(self):
+        ChatMessage.objects.create(meeting=self.meeting, sender=self.users[1], message='Quarterly roadmap review')
+        ChatMessage.objects.bulk_create([
+            ChatMessage(meeting=self.meeting, sender=self.users[2], message='Roadmap draft attached')
+        ])
+        self.assertEqual(self.search('roadmap'), ['Roadmap draft attached', 'Quarterly roadmap review'])
+        # The last word matches as a prefix
+        self.assertEqual(self.search('quarterly road'), ['Quarterly roadmap review'])
+
+    def test_update_and_delete(self):
+        message = ChatMessage.objects.create(meeting=self.meeting, sender=self.users[1], message='Lunch at noon')
+        message.message = 'Dinner at eight'
+        message.save()
+        self.assertEqual(self.search('lunch'), [])
+        self.assertEqual(self.search('dinner'), ['Dinner at eight'])
+        message.delete()
+        self.assertEqual(self.search('dinner'), [])
+
+
+class ChatLogWriterTests(MeetingTestCase):
+    """A batch of socket chat messages only loses the messages that break a constraint"""
+
+    def message(self, text, **kwargs):
+        return ChatMessage(meeting=self.meeting, sender=self.users[1], message=text, created_at=timezone.now(), **kwargs)
+
+    def test_batch(self):
+        writer = ChatLogWriter(interval=1, batch_size=100)
+        writer._pending = [self.message('one'), self.message('two')]
+        writer.flush_sync()
+        self.assertEqual(writer.stats['messages'], 2)
+        self.assertEqual(ChatMessage.objects.count(), 2)
+
+    def test_drops_only_failing_rows(self):
+        existing = ChatMessage.objects.create(meeting=self.meeting, sender=self.users[1], message='stored')
+        writer = ChatLogWriter(interval=1, batch_size=100)
+        writer._pending = [self.message('one'), self.message('duplicate', uuid=existing.uuid), self.message('two')]
+        with self.assertLogs('realtime.chatlog', 'WARNING'):
+            writer.flush_sync()
+        self.assertEqual(writer.stats['messages'], 2)
+        self.assertEqual(writer.stats['failed'], 1)
+        self.assertEqual(
+            set(ChatMessage.objects.values_list('message', flat=True)), {'stored', 'one', 'two'}
+        )
+
+
+class FileTestCase(MeetingTestCase):
+    """Shared files stored in a temporary MEDIA_ROOT"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=media_root.name, FILE_DOWNLOAD_MODE='python')
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def start_upload(self, content, filename='notes.txt', **data):
+        return self.client.post(reverse('start_upload'), {
+            'meeting_id': self.meeting.id, 'filename': filename, 'file_size': len(content), **data
+        })
+
+    def put_chunk(self, upload_id, offset, chunk):
+        url = reverse('resumable_upload', args=[upload_id])
+        return self.client.put(f'{url}?offset={offset}', chunk, content_type='application/octet-stream')
+
+    def share(self, content, filename='notes.txt'):
+        """Upload `content` in one chunk and return the shared file"""
+        upload_id = self.start_upload(content, filename).data['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0, content).status_code, 200)
+        response = self.client.post(reverse('finalize_upload', args=[upload_id]))
+        self.assertEqual(response.status_code, 201)
+        return SharedFile.objects.get(id=response.data['id'])
+
+
+class ResumableUploadTests(FileTestCase):
+    """Chunks are only accepted at the offset the server has reached"""
+
+    def test_chunks(self):
+        content = b'0123456789'
+        upload_id = self.start_upload(content).data['upload_id']
+
+        response = self.put_chunk(upload_id, 4, content[4:])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 0)
+
+        self.assertEqual(self.put_chunk(upload_id, 0, content[:4]).data['offset'], 4)
+        # Sent again, e.g. after a lost response
+        response = self.put_chunk(upload_id, 0, content[:4])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['offset'], 4)
+        self.assertEqual(self.client.get(reverse('resumable_upload', args=[upload_id])).data['offset'], 4)
+
+        self.assertEqual(self.put_chunk(upload_id, 4, content[4:]).data['offset'], 10)
+        response = self.client.post(reverse('finalize_upload', args=[upload_id]))
+        self.assertEqual(response.status_code, 201)
+        shared_file = SharedFile.objects.get(id=response.data['id'])
+        with shared_file.file.open('rb') as file:
+            self.assertEqual(file.read(), content)
+        self.assertEqual(shared_file.content_hash, hashlib.sha256(content).hexdigest())
+
+    def test_chunk_past_file_size(self):
+        upload_id = self.start_upload(b'0123').data['upload_id']
+        self.assertEqual(self.put_chunk(upload_id, 0, b'012345').status_code, 400)
+
+    def test_finalize_incomplete(self):
+        upload_id = self.start_upload(b'0123').data['upload_id']
+        self.put_chunk(upload_id, 0, b'01')
+        self.assertEqual(self.client.post(reverse('finalize_upload', args=[upload_id])).status_code, 400)
+
+
+class BlobTests(FileTestCase):
+    """Files with the same content share one blob, deleted with its last reference"""
+
+    def test_ref_count(self):
+        content = b'same content'
+        first = self.share(content)
+        second = self.share(content, 'copy.txt')
+        blob = FileBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(first.file.name, second.file.name)
+
+        # Known content is shared without sending it again
+        response = self.start_upload(content, 'third.txt', sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('upload_id', response.data)
+        blob.refresh_from_db()
+        self.assertEqual(blob.ref_count, 3)
+
+        path = blob.file.path
+        for shared_file in SharedFile.objects.all():
+            with self.captureOnCommitCallbacks(execute=True):
+                shared_file.delete()
+        self.assertFalse(FileBlob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_unknown_hash_must_be_uploaded(self):
+        content = b'new content'
+        response = self.start_upload(content, sha256=hashlib.sha256(content).hexdigest())
+        self.assertEqual(response.status_code, 201)
+        self.assertIn('upload_id', response.data)
+
+
+class DownloadTests(FileTestCase):
+    """Downloads answer conditional and byte range requests"""
+
+    content = b'abcdefghijklmnopqrstuvwxyz'
+
+    def setUp(self):
+        super().setUp()
+        self.shared_file = self.share(self.content)
+        self.url = reverse('download_file', args=[self.shared_file.id])
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertEqual(response['ETag'], f'"{self.shared_file.content_hash}"')
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 2-5/{len(self.content)}')
+        self.assertEqual(b''.join(response.streaming_content), b'cdef')
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=-3')
+        self.assertEqual(b''.join(response.streaming_content), b'xyz')
+
+    def test_multiple_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-1,10-11')
+        self.assertEqual(response.status_code, 206)
+        self.assertTrue(response['Content-Type'].startswith('multipart/byteranges; boundary='))
+        body = b''.join(response.streaming_content)
+        self.assertEqual(len(body), int(response['Content-Length']))
+        self.assertIn(b'\r\n\r\nab\r\n', body)
+        self.assertIn(b'\r\n\r\nkl\r\n', body)
+
+    def test_unsatisfiable_range(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=100-200')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+
+    def test_if_range(self):
+        etag = f'"{self.shared_file.content_hash}"'
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        # The file changed since the client's copy: send all of it
+        response = self.client.get(self.url, HTTP_RANGE='bytes=2-5', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_access(self):
+        outsider = User.objects.create_user(email='outsider@example.com', username='outsider', password='password')
+        self.client.force_authenticate(outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_not_served_from_media_url(self):
+        file_url = self.client.get(reverse('get_files', args=[self.meeting.id])).data[0]['file_url']
+        self.assertTrue(file_url.endswith(self.url))
@@ -0,0 +1,180 @@
+"""
+Background thumbnails for shared images and PDFs.
+
+When a SharedFile is created its id is queued (chat.signals, after the
+transaction commits). A dispatcher thread hands each render to a process
+pool of THUMBNAIL_WORKERS processes (chat.previews), so decoding large
+images and PDFs never blocks a request or holds the GIL, and stores the
+JPEG at thumbnails/<xx>/<sha256>.jpg. Thumbnails are keyed by content hash
+like blobs, so content shared again gets the existing thumbnail without
+rendering. SharedFileSerializer exposes it as `thumbnail_url`, the
+access-checked download_thumbnail view.
+
+Images larger than THUMBNAIL_MAX_PIXELS are not previewed. If a worker
+dies (e.g. killed for running out of memory) the pool is broken: it is
+replaced, and the jobs it took down are rendered once more.
+
+The in-process queue is a stand-in for a real job queue: jobs pending when
+the process exits are lost, and generate_thumbnails fills in any missing
+thumbnails. With THUMBNAIL_WORKERS = 0 thumbnails are rendered inline,
+which is meant for development and tests.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+
+from meetings.versions import bump_version
+
+from .models import SharedFile
+from .previews import limit_image_pixels, preview_kind, render_thumbnail
+
+logger = logging.getLogger(__name__)
+
+
+def make_pool(workers):
+    # Spawned workers import only chat.previews, never a copy of this process
+    return ProcessPoolExecutor(
+        workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=limit_image_pixels,
+        initargs=(settings.THUMBNAIL_MAX_PIXELS,)
+    )
+
+
+def thumbnail_name(sha256):
+    return os.path.join('thumbnails', sha256[:2], f'{sha256}.jpg')
+
+
+def render_job(shared_file):
+    """Arguments of render_thumbnail for a file, or None if it gets no preview"""
+    kind = preview_kind(shared_file.filename)
+    if kind is None or not shared_file.content_hash:
+        return None
+    return shared_file.file.path, kind, settings.THUMBNAIL_SIZE, settings.THUMBNAIL_MAX_PIXELS
+
+
+def store_thumbnail(sha256, data=None):
+    """
+    Attach the thumbnail of some content to every SharedFile with that
+    content, saving `data` first unless it is already stored.
+    Returns False if there is neither a stored thumbnail nor data.
+    """
+    name = thumbnail_name(sha256)
+    if not default_storage.exists(name):
+        if data is None:
+            return False
+        name = default_storage.save(name, ContentFile(data))
+    waiting = SharedFile.objects.filter(content_hash=sha256, thumbnail='')
+    meeting_ids = set(waiting.values_list('meeting_id', flat=True))
+    waiting.update(thumbnail=name)
+    # update() sends no post_save, see chat.signals
+    bump_version('files', *meeting_ids)
+    return True
+
+
+class ThumbnailPipeline:
+    """
+    Queue of shared file ids rendered by a process pool. One dispatcher
+    thread does all database and storage work; the pool only renders.
+    """
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.queue = queue.Queue()
+        self._pool = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def enqueue(self, shared_file_id):
+        if not self.workers:
+            try:
+                self.generate(shared_file_id)
+            except Exception:
+                logger.exception(f"Thumbnail render failed for {shared_file_id}")
+            return
+        with self._lock:
+            if self._thread is None:
+                self._pool = make_pool(self.workers)
+                self._thread = threading.Thread(target=self._run, name='thumbnails', daemon=True)
+                self._thread.start()
+        self.queue.put(('render', shared_file_id, False))
+
+    def generate(self, shared_file_id):
+        """Render and store a file's thumbnail in the calling thread"""
+        job = self._job(shared_file_id)
+        if job is not None:
+            sha256, args = job
+            store_thumbnail(sha256, render_thumbnail(*args))
+
+    def _job(self, shared_file_id):
+        """(sha256, render arguments) if the file still needs rendering"""
+        shared_file = SharedFile.objects.filter(id=shared_file_id, thumbnail='').first()
+        if shared_file is None:
+            return None
+        args = render_job(shared_file)
+        if args is None or store_thumbnail(shared_file.content_hash):
+            return None
+        return shared_file.content_hash, args
+
+    def _run(self):
+        while True:
+            action, shared_file_id, *payload = self.queue.get()
+            try:
+                if action == 'render':
+                    job = self._job(shared_file_id)
+                    if job is not None:
+                        self._submit(shared_file_id, *job, *payload)
+                else:
+                    sha256, retried, pool, future = payload
+                    try:
+                        data = future.result()
+                    except BrokenProcessPool:
+                        self._replace_pool(pool)
+                        if retried:
+                            raise
+                        # Taken down with the pool, maybe by another job
+                        self.queue.put(('render', shared_file_id, True))
+                    else:
+                        store_thumbnail(sha256, data)
+            except Exception:
+                logger.exception(f"Thumbnail {action} failed for {shared_file_id}")
+            finally:
+                close_old_connections()
+
+    def _submit(self, shared_file_id, sha256, args, retried):
+        try:
+            future = self._pool.submit(render_thumbnail, *args)
+        except BrokenProcessPool:
+            self._replace_pool()
+            future = self._pool.submit(render_thumbnail, *args)
+        future.add_done_callback(
+            lambda future, pool=self._pool: self.queue.put(('store', shared_file_id, sha256, retried, pool, future))
+        )
+
+    def _replace_pool(self, broken=None):
+        """Replace the broken pool, unless the pool a job failed in was already replaced"""
+        if broken is not None and broken is not self._pool:
+            return
+        logger.warning("Thumbnail process pool broke, starting a new one")
+        self._pool.shutdown(wait=False)
+        self._pool = make_pool(self.workers)
+
+
+_pipeline = None
+
+
+def get_thumbnail_pipeline():
+    """Return the process-wide ThumbnailPipeline, built from THUMBNAIL_WORKERS"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = ThumbnailPipeline(settings.THUMBNAIL_WORKERS)
+    return _pipeline
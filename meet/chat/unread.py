@@ -0,0 +1,68 @@
+"""
+Per-(user, meeting) chat read cursors and unread counts.
+
+A ChatReadCursor stores the (created_at, id) position of the last message a
+user has read. The unread count is a range count on the (meeting,
+created_at, id) index from that position, excluding the user's own
+messages, and stops at CHAT_UNREAD_COUNT_LIMIT so it stays cheap however
+far behind the user is. Archived history is always considered read.
+"""
+
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from realtime.registry import get_channel_registry
+
+from .models import ChatMessage, ChatReadCursor
+
+
+def unread_count(user_id, meeting_id):
+    """Return how many messages from others the user has not read, up to CHAT_UNREAD_COUNT_LIMIT"""
+    position = ChatReadCursor.objects.filter(user_id=user_id, meeting_id=meeting_id).values_list(
+        'last_read_at', 'last_read_message_id'
+    ).first()
+    messages = ChatMessage.objects.filter(meeting_id=meeting_id).exclude(sender_id=user_id)
+    if position:
+        created_at, pk = position
+        messages = messages.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    return messages.values('id')[:settings.CHAT_UNREAD_COUNT_LIMIT].count()
+
+
+def mark_read(user_id, meeting_id, position=None):
+    """
+    Move the user's read cursor forward to `position`, a (created_at, id)
+    pair, or to the meeting's latest message if None. A cursor never moves
+    backwards. Returns the new unread count.
+    """
+    if position is None:
+        position = ChatMessage.objects.filter(meeting_id=meeting_id).order_by('-created_at', '-id').values_list(
+            'created_at', 'id'
+        ).first()
+        if position is None:
+            return 0
+
+    created_at, pk = position
+    updated = ChatReadCursor.objects.filter(user_id=user_id, meeting_id=meeting_id).filter(
+        Q(last_read_at__lt=created_at) | Q(last_read_at=created_at, last_read_message_id__lt=pk)
+    ).update(last_read_at=created_at, last_read_message_id=pk, updated_at=timezone.now())
+    if not updated:
+        ChatReadCursor.objects.get_or_create(
+            user_id=user_id,
+            meeting_id=meeting_id,
+            defaults={'last_read_at': created_at, 'last_read_message_id': pk}
+        )
+    return unread_count(user_id, meeting_id)
+
+
+async def push_unread_count(meeting_id, user_id, count):
+    """Send the new unread count to the user's socket in the meeting, if connected"""
+    channel_layer = get_channel_layer()
+    channel_name = await get_channel_registry(channel_layer).lookup(meeting_id, user_id)
+    if channel_name:
+        await channel_layer.send(channel_name, {
+            'type': 'unread_update',
+            'meeting_id': int(meeting_id),
+            'unread_count': count
+        })
@@ -0,0 +1,163 @@
+"""
+Resumable chunked uploads of shared meeting files.
+
+A client announces the file (name and size) to start a FileUpload, which is
+checked against MAX_UPLOAD_SIZE and ALLOWED_UPLOAD_EXTENSIONS before any
+byte is sent. It then PUTs the file in chunks of up to UPLOAD_CHUNK_MAX_SIZE
+bytes, each at the offset the server has confirmed so far. Chunks are
+copied from the request stream into a part file under MEDIA_ROOT without
+being buffered, and bytes received before a dropped connection are kept, so
+the client resumes from the last confirmed offset. Writers of an upload
+are serialized by an exclusive lock on its part file, taken without
+waiting, so two requests never write to it at once. No database
+transaction is open while a chunk streams in; the offset is then advanced
+with a conditional update. Finalizing moves the complete part
+file into content-addressed storage (see chat.blobs), or drops it if the
+same content is already stored.
+
+Unfinished uploads older than UPLOAD_EXPIRE_HOURS are removed by the
+clean_uploads command.
+"""
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+import os
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+    import msvcrt
+
+from .blobs import acquire_blob, discard_stored, share_blob
+from .models import FileUpload, file_sha256
+
+PART_DIR = 'partial_uploads'
+COPY_BLOCK_SIZE = 64 * 1024
+
+
+def validate_upload(filename, file_size):
+    """Return an error message if a file may not be shared, None otherwise"""
+    if file_size > settings.MAX_UPLOAD_SIZE:
+        return f'File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / 1048576}MB'
+    file_ext = os.path.splitext(filename)[1].lower()
+    if file_ext not in settings.ALLOWED_UPLOAD_EXTENSIONS:
+        return f'File type {file_ext} is not allowed. Allowed types: {", ".join(settings.ALLOWED_UPLOAD_EXTENSIONS)}'
+    return None
+
+
+def part_path(upload):
+    return os.path.join(settings.MEDIA_ROOT, PART_DIR, f'{upload.id}.part')
+
+
+def part_size(upload):
+    """Bytes in an upload's part file"""
+    try:
+        return os.path.getsize(part_path(upload))
+    except FileNotFoundError:
+        return 0
+
+
+def try_lock(part):
+    """Take an exclusive lock on an open part file, or return False if another writer has it"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(part.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    # Released when the file is closed
+    return True
+
+
+def write_chunk(upload, offset, stream, length):
+    """
+    Copy up to `length` bytes from `stream` into the upload at `offset`,
+    which must still be its offset. Bytes received before the stream ends
+    early are kept. Returns the new offset, or None if another request is
+    writing or wrote at this offset first, or the upload is gone.
+    """
+    path = part_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Opened without truncating: another writer may hold it
+    with open(os.open(path, os.O_RDWR | os.O_CREAT | getattr(os, 'O_BINARY', 0)), 'r+b') as part:
+        if not try_lock(part):
+            return None
+        if not FileUpload.objects.filter(pk=upload.pk, offset=offset).exists():
+            return None
+        part.seek(offset)
+        remaining = length
+        while remaining:
+            block = stream.read(min(COPY_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            part.write(block)
+            remaining -= len(block)
+        # Drop anything past the new offset left by an abandoned attempt
+        part.truncate()
+        new_offset = offset + length - remaining
+        updated = FileUpload.objects.filter(pk=upload.pk, offset=offset).update(
+            offset=new_offset, updated_at=timezone.now()
+        )
+    if not updated:
+        return None
+    upload.offset = new_offset
+    return new_offset
+
+
+class PartFile(File):
+    """A complete part file; file system storage moves it into place instead of copying it"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def complete_upload(upload):
+    """
+    Turn a complete upload into a SharedFile and forget the upload. Returns
+    None if the upload was finalized or cancelled by another request.
+    """
+    path = part_path(upload)
+    blob = stored = None
+    try:
+        part = open(path, 'rb')
+    except FileNotFoundError:
+        # Moved into place by a concurrent finalize
+        return None
+    try:
+        with part:
+            part_file = PartFile(part, name=upload.filename)
+            # Hashed before the transaction, which stays short
+            sha256 = file_sha256(part_file)
+            with transaction.atomic():
+                # A concurrent finalize waits here, then finds the upload gone
+                if not FileUpload.objects.select_for_update().filter(pk=upload.pk).exists():
+                    return None
+                blob, stored = acquire_blob(sha256, upload.file_size, part_file)
+                shared_file = share_blob(blob, upload.meeting_id, upload.uploaded_by_id, upload.filename)
+                upload.delete()
+    except Exception:
+        if stored:
+            if not os.path.exists(path):
+                # The part file was moved into place: move it back, so finalizing can be retried
+                os.replace(default_storage.path(blob.file.name), path)
+            else:
+                discard_stored(blob)
+        raise
+    # Still there if the content was already stored
+    if os.path.exists(path):
+        os.remove(path)
+    return shared_file
+
+
+def discard_upload(upload):
+    """Delete an unfinished upload and its part file"""
+    upload.delete()
+    try:
+        os.remove(part_path(upload))
+    except FileNotFoundError:
+        pass
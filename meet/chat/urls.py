@@ -3,8 +3,17 @@ from . import views
 
 urlpatterns = [
     path('send-message/', views.send_message, name='send_message'),
+    path('send-messages/', views.send_messages, name='send_messages'),
     path('meetings/<int:meeting_id>/messages/', views.get_messages, name='get_messages'),
+    path('meetings/<int:meeting_id>/messages/export/', views.export_messages, name='export_messages'),
+    path('meetings/<int:meeting_id>/unread/', views.get_unread_count, name='get_unread_count'),
+    path('meetings/<int:meeting_id>/read/', views.mark_messages_read, name='mark_messages_read'),
+    path('search/', views.search_messages, name='search_messages'),
     path('upload-file/', views.upload_file, name='upload_file'),
+    path('uploads/', views.start_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.resumable_upload, name='resumable_upload'),
+    path('uploads/<uuid:upload_id>/finalize/', views.finalize_upload, name='finalize_upload'),
     path('meetings/<int:meeting_id>/files/', views.get_files, name='get_files'),
     path('download-file/<int:file_id>/', views.download_file, name='download_file'),
+    path('download-file/<int:file_id>/thumbnail/', views.download_thumbnail, name='download_thumbnail'),
 ]
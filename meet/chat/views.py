@@ -3,17 +3,36 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
-from django.http import FileResponse, Http404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, StreamingHttpResponse
 from django.conf import settings
-from .models import ChatMessage, SharedFile
+from django.db import transaction
+from asgiref.sync import async_to_sync
+from .blobs import acquire_blob, discard_stored, is_shared_in, share_blob
+from .models import ChatArchive, ChatMessage, FileUpload, SharedFile, file_sha256
+from .downloads import file_response, thumbnail_response
+from .export import EXPORT_FORMATS, ablocks, blocks, export_rows
+from .pagination import MessageCursorPagination, decode_cursor
+from .search import filter_by_search
+from .unread import mark_read, push_unread_count, unread_count
+from .uploads import complete_upload, discard_upload, part_size, validate_upload, write_chunk
 from .serializers import (
-    ChatMessageSerializer, SendMessageSerializer,
-    SharedFileSerializer, FileUploadSerializer
+    ChatMessageSerializer, ChatMessageSlimSerializer, SendMessageSerializer, BulkSendMessageSerializer,
+    SharedFileSerializer, SharedFileSlimSerializer, FileUploadSerializer, StartUploadSerializer,
+    serialize_users
 )
+from meetings.access import accessible_meetings, has_meeting_access
 from meetings.models import Meeting
+from meetings.versions import bump_version, conditional_on_version, get_version
+from realtime.chatlog import broadcast_chat, chat_frame
 import os
 
 
+def is_slim(request):
+    """Whether the client asked for the slim (ids + users map) response"""
+    return request.query_params.get('slim', '0') in ('1', 'true')
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def send_message(request):
@@ -29,6 +48,12 @@ def send_message(request):
     
     meeting = get_object_or_404(Meeting, id=meeting_id)
     
+    if not has_meeting_access(meeting.id, request.user):
+        return Response(
+            {'error': 'You are not authorized to send messages in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
     # Create message
     message = ChatMessage.objects.create(
         meeting=meeting,
@@ -36,31 +61,207 @@ def send_message(request):
         message=message_text
     )
     
+    # Deliver to clients connected to the meeting socket
+    async_to_sync(broadcast_chat)(meeting.id, [chat_frame(request.user, message)])
+    
     response_serializer = ChatMessageSerializer(message)
     return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def send_messages(request):
+    """
+    Send several messages to a meeting at once, e.g. from a bot.
+    All messages are validated together and written with one bulk insert;
+    returns the ids of the created messages in order.
+    """
+    serializer = BulkSendMessageSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    meeting = get_object_or_404(Meeting, id=serializer.validated_data['meeting_id'])
+    
+    if not has_meeting_access(meeting.id, request.user):
+        return Response(
+            {'error': 'You are not authorized to send messages in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    with transaction.atomic():
+        messages = ChatMessage.objects.bulk_create([
+            ChatMessage(meeting=meeting, sender=request.user, message=message_text)
+            for message_text in serializer.validated_data['messages']
+        ])
+    # bulk_create sends no post_save, see chat.signals
+    bump_version('chat', meeting.id)
+    
+    async_to_sync(broadcast_chat)(meeting.id, [
+        chat_frame(request.user, message) for message in messages
+    ])
+    
+    return Response({'ids': [message.id for message in messages]}, status=status.HTTP_201_CREATED)
+
+
+def meeting_version(scope):
+    """Version of a meeting's chat or files, for users who can see them"""
+    def version(request, meeting_id):
+        if not has_meeting_access(meeting_id, request.user):
+            return None
+        return get_version(scope, meeting_id)
+    return version
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_version(meeting_version('chat'))
 def get_messages(request, meeting_id):
     """
-    Fetch all messages for a meeting.
+    Fetch a page of messages for a meeting, oldest first.
+    Without a cursor the latest messages are returned; pass
+    `before=<previous_cursor>` to scroll back or `after=<next_cursor>` to
+    fetch only messages sent since. `limit` sets the page size.
+    With `slim=1` each message carries only the sender id and the senders
+    are returned once in a `users` map.
     """
     meeting = get_object_or_404(Meeting, id=meeting_id)
     
     # Check if user is part of the meeting
-    is_host = meeting.host == request.user
-    is_participant = meeting.participants.filter(user=request.user).exists()
+    if not has_meeting_access(meeting.id, request.user):
+        return Response(
+            {'error': 'You are not authorized to view messages in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    paginator = MessageCursorPagination()
+    try:
+        messages = paginator.paginate_queryset(
+            ChatMessage.objects.filter(meeting=meeting).select_related('sender'),
+            request,
+            archives=list(ChatArchive.objects.filter(meeting=meeting).defer('data'))
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if not is_slim(request):
+        serializer = ChatMessageSerializer(messages, many=True)
+        return paginator.get_paginated_response(serializer.data)
     
-    if not (is_host or is_participant):
+    serializer = ChatMessageSlimSerializer(messages, many=True)
+    response = paginator.get_paginated_response(serializer.data)
+    response.data['users'] = serialize_users(message.sender for message in messages)
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_unread_count(request, meeting_id):
+    """
+    Get the number of messages from others the user has not read in a meeting.
+    """
+    if not has_meeting_access(meeting_id, request.user):
         return Response(
             {'error': 'You are not authorized to view messages in this meeting.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    messages = ChatMessage.objects.filter(meeting=meeting)
+    return Response({
+        'meeting_id': meeting_id,
+        'unread_count': unread_count(request.user.id, meeting_id)
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def mark_messages_read(request, meeting_id):
+    """
+    Mark messages as read up to `cursor` (a message cursor from
+    get_messages), or up to the latest message if no cursor is given.
+    """
+    if not has_meeting_access(meeting_id, request.user):
+        return Response(
+            {'error': 'You are not authorized to view messages in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    position = None
+    if request.data.get('cursor'):
+        try:
+            position = decode_cursor(str(request.data['cursor']))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    count = mark_read(request.user.id, meeting_id, position)
+    async_to_sync(push_unread_count)(meeting_id, request.user.id, count)
+    return Response({
+        'meeting_id': meeting_id,
+        'unread_count': count
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_messages(request, meeting_id):
+    """
+    Stream a meeting's whole chat history, archived messages included, as
+    CSV (`type=csv`, default) or JSON lines (`type=jsonl`).
+    Only the meeting host and staff can export.
+    """
+    meeting = get_object_or_404(Meeting, id=meeting_id)
+    
+    if meeting.host_id != request.user.id and not request.user.is_staff:
+        return Response(
+            {'error': 'Only the meeting host can export the chat.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    export_type = request.query_params.get('type', 'csv')
+    if export_type not in EXPORT_FORMATS:
+        return Response(
+            {'error': f'Unknown export type {export_type}. Allowed types: {", ".join(EXPORT_FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    render, content_type = EXPORT_FORMATS[export_type]
+    lines = render(export_rows(meeting.id))
+    # Each handler only streams its own kind of iterator, see chat.export
+    content = ablocks(lines) if isinstance(request._request, ASGIRequest) else blocks(lines)
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="meeting-{meeting.id}-chat.{export_type}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_messages(request):
+    """
+    Full-text search over messages in the meetings the user can access,
+    newest first. `q` is required; `meeting_id` restricts the search to one
+    meeting and `limit` sets the number of results.
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    meeting_id = request.query_params.get('meeting_id')
+    if meeting_id:
+        if not has_meeting_access(meeting_id, request.user):
+            return Response(
+                {'error': 'You are not authorized to view messages in this meeting.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        messages = ChatMessage.objects.filter(meeting_id=meeting_id)
+    else:
+        messages = ChatMessage.objects.filter(meeting__in=accessible_meetings(request.user))
+    
+    try:
+        limit = MessageCursorPagination().get_page_size(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    messages = filter_by_search(messages, query).select_related('sender').order_by('-created_at', '-id')[:limit]
     serializer = ChatMessageSerializer(messages, many=True)
-    return Response(serializer.data)
+    return Response({'results': serializer.data})
 
 
 @api_view(['POST'])
@@ -76,55 +277,208 @@ def upload_file(request):
     meeting_id = serializer.validated_data['meeting_id']
     uploaded_file = serializer.validated_data['file']
     
-    # Check file size
-    if uploaded_file.size > settings.MAX_UPLOAD_SIZE:
-        return Response(
-            {'error': f'File size exceeds maximum allowed size of {settings.MAX_UPLOAD_SIZE / 1048576}MB'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    # Check file size and extension
+    error = validate_upload(uploaded_file.name, uploaded_file.size)
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    meeting = get_object_or_404(Meeting, id=meeting_id)
+    
+    # Store the content once, however many meetings share it
+    sha256 = file_sha256(uploaded_file)
+    blob = stored = None
+    try:
+        with transaction.atomic():
+            blob, stored = acquire_blob(sha256, uploaded_file.size, uploaded_file)
+            shared_file = share_blob(blob, meeting.id, request.user.id, os.path.basename(uploaded_file.name))
+    except Exception:
+        if stored:
+            discard_stored(blob)
+        raise
+    
+    response_serializer = SharedFileSerializer(shared_file, context={'request': request})
+    return Response(response_serializer.data, status=status.HTTP_201_CREATED)
+
+
+def upload_status(upload):
+    return {
+        'upload_id': str(upload.id),
+        'filename': upload.filename,
+        'file_size': upload.file_size,
+        'offset': upload.offset,
+        'chunk_size': settings.UPLOAD_CHUNK_MAX_SIZE,
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_upload(request):
+    """
+    Start a resumable upload of a file up to MAX_UPLOAD_SIZE.
+    The size and extension are checked before any data is sent.
+    If `sha256` names content already shared in a meeting the user can
+    access, the file is shared right away and the shared file is returned
+    instead of an upload.
+    """
+    serializer = StartUploadSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
-    # Check file extension
-    file_ext = os.path.splitext(uploaded_file.name)[1].lower()
-    if file_ext not in settings.ALLOWED_UPLOAD_EXTENSIONS:
+    meeting = get_object_or_404(Meeting, id=serializer.validated_data['meeting_id'])
+    if not has_meeting_access(meeting.id, request.user):
         return Response(
-            {'error': f'File type {file_ext} is not allowed. Allowed types: {", ".join(settings.ALLOWED_UPLOAD_EXTENSIONS)}'},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'You are not authorized to share files in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
         )
     
-    meeting = get_object_or_404(Meeting, id=meeting_id)
+    filename = os.path.basename(serializer.validated_data['filename'])
+    error = validate_upload(filename, serializer.validated_data['file_size'])
+    if error:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    
+    file_size = serializer.validated_data['file_size']
+    sha256 = serializer.validated_data.get('sha256')
+    # Only content the user can already download, see chat.blobs
+    if sha256 and is_shared_in(sha256, file_size, accessible_meetings(request.user)):
+        with transaction.atomic():
+            blob, _ = acquire_blob(sha256, file_size)
+            if blob is not None:
+                shared_file = share_blob(blob, meeting.id, request.user.id, filename)
+                response_serializer = SharedFileSerializer(shared_file, context={'request': request})
+                return Response(response_serializer.data, status=status.HTTP_201_CREATED)
     
-    # Create shared file
-    shared_file = SharedFile.objects.create(
+    upload = FileUpload.objects.create(
         meeting=meeting,
         uploaded_by=request.user,
-        file=uploaded_file
+        filename=filename,
+        file_size=file_size
     )
+    return Response(upload_status(upload), status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def resumable_upload(request, upload_id):
+    """
+    GET: how many bytes of an upload the server has, to resume from.
+    PUT: append the raw request body at `?offset=`, which must equal the
+    current offset. Returns the new offset.
+    DELETE: cancel the upload.
+    """
+    upload = get_object_or_404(FileUpload, id=upload_id, uploaded_by=request.user)
+    
+    if request.method == 'DELETE':
+        # Allowed after losing access to the meeting, so uploads can be cleaned up
+        discard_upload(upload)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    
+    if not has_meeting_access(upload.meeting_id, request.user):
+        return Response(
+            {'error': 'You are not authorized to share files in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if request.method == 'GET':
+        return Response(upload_status(upload))
+    
+    try:
+        offset = int(request.query_params['offset'])
+    except (KeyError, ValueError):
+        return Response({'error': 'offset query parameter is required.'}, status=status.HTTP_400_BAD_REQUEST)
+    if offset != upload.offset:
+        return Response(
+            {'error': f'Expected a chunk at offset {upload.offset}.', 'offset': upload.offset},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or '')
+    except ValueError:
+        return Response({'error': 'Content-Length is required.'}, status=status.HTTP_411_LENGTH_REQUIRED)
+    if length <= 0 or length > settings.UPLOAD_CHUNK_MAX_SIZE:
+        return Response(
+            {'error': f'Chunks must be between 1 and {settings.UPLOAD_CHUNK_MAX_SIZE} bytes.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if offset + length > upload.file_size:
+        return Response(
+            {'error': f'Chunk ends past the announced file size of {upload.file_size} bytes.'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
+    # Read the body as a stream so the chunk is never held in memory
+    new_offset = write_chunk(upload, offset, request.stream, length)
+    if new_offset is None:
+        upload = get_object_or_404(FileUpload, id=upload_id)
+        return Response(
+            {'error': 'Another chunk was written at this offset.', 'offset': upload.offset},
+            status=status.HTTP_409_CONFLICT
+        )
+    return Response(upload_status(upload))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finalize_upload(request, upload_id):
+    """
+    Complete an upload once every byte has been received and share the file.
+    """
+    upload = get_object_or_404(FileUpload, id=upload_id, uploaded_by=request.user)
+    if not has_meeting_access(upload.meeting_id, request.user):
+        return Response(
+            {'error': 'You are not authorized to share files in this meeting.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    # Once every byte is confirmed no chunk can be written any more
+    if upload.offset != upload.file_size:
+        return Response(
+            {'error': f'Upload is incomplete: {upload.offset} of {upload.file_size} bytes received.',
+             'offset': upload.offset},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    received = part_size(upload)
+    if received != upload.file_size:
+        return Response(
+            {'error': f'Upload is damaged: {received} of {upload.file_size} bytes stored. Cancel and start again.'},
+            status=status.HTTP_409_CONFLICT
+        )
+    
+    shared_file = complete_upload(upload)
+    if shared_file is None:
+        raise Http404('Upload was finalized or cancelled meanwhile.')
     response_serializer = SharedFileSerializer(shared_file, context={'request': request})
     return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_version(meeting_version('files'))
 def get_files(request, meeting_id):
     """
     Get all shared files for a meeting.
+    With `slim=1` the response is {"results": [...], "users": {...}}, each
+    file carrying only the uploader id.
     """
     meeting = get_object_or_404(Meeting, id=meeting_id)
     
     # Check if user is part of the meeting
-    is_host = meeting.host == request.user
-    is_participant = meeting.participants.filter(user=request.user).exists()
-    
-    if not (is_host or is_participant):
+    if not has_meeting_access(meeting.id, request.user):
         return Response(
             {'error': 'You are not authorized to view files in this meeting.'},
             status=status.HTTP_403_FORBIDDEN
         )
     
-    files = SharedFile.objects.filter(meeting=meeting)
-    serializer = SharedFileSerializer(files, many=True, context={'request': request})
-    return Response(serializer.data)
+    files = SharedFile.objects.filter(meeting=meeting).select_related('uploaded_by')
+    if not is_slim(request):
+        serializer = SharedFileSerializer(files, many=True, context={'request': request})
+        return Response(serializer.data)
+    
+    files = list(files)
+    serializer = SharedFileSlimSerializer(files, many=True, context={'request': request})
+    return Response({
+        'results': serializer.data,
+        'users': serialize_users(shared_file.uploaded_by for shared_file in files)
+    })
 
 
 @api_view(['GET'])
@@ -136,11 +490,7 @@ def download_file(request, file_id):
     shared_file = get_object_or_404(SharedFile, id=file_id)
     
     # Check if user is part of the meeting
-    meeting = shared_file.meeting
-    is_host = meeting.host == request.user
-    is_participant = meeting.participants.filter(user=request.user).exists()
-    
-    if not (is_host or is_participant):
+    if not has_meeting_access(shared_file.meeting_id, request.user):
         return Response(
             {'error': 'You are not authorized to download this file.'},
             status=status.HTTP_403_FORBIDDEN
@@ -149,9 +499,7 @@ def download_file(request, file_id):
     try:
         file_path = shared_file.file.path
         if os.path.exists(file_path):
-            response = FileResponse(open(file_path, 'rb'))
-            response['Content-Disposition'] = f'attachment; filename="{shared_file.filename}"'
-            return response
+            return file_response(request, shared_file)
         else:
             raise Http404('File not found')
     except Exception as e:
@@ -159,3 +507,22 @@ def download_file(request, file_id):
             {'error': str(e)},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def download_thumbnail(request, file_id):
+    """
+    Download the thumbnail of a shared file.
+    """
+    shared_file = get_object_or_404(SharedFile, id=file_id)
+    
+    if not has_meeting_access(shared_file.meeting_id, request.user):
+        return Response(
+            {'error': 'You are not authorized to download this file.'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    if not shared_file.thumbnail or not os.path.exists(shared_file.thumbnail.path):
+        raise Http404('Thumbnail not found')
+    return thumbnail_response(request, shared_file)
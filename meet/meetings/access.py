@@ -0,0 +1,90 @@
+"""
+Cached meeting access checks.
+
+A user can access a meeting if they are its host or one of its participants.
+The answer is cached per (meeting, user) for MEETING_ACCESS_CACHE_TIMEOUT
+seconds and invalidated by the signal handlers in meetings.signals whenever
+a MeetingParticipant row or a meeting's host changes.
+
+Invalidations only reach other processes (the WebSocket server, other HTTP
+workers) through a shared cache, so answers are only cached when CACHE_URL
+configures one. With the default per-process LocMemCache every check
+queries the database; otherwise a removed participant could keep access
+in another process until the entry expired.
+"""
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import Exists, OuterRef, Q
+from channels.db import database_sync_to_async
+
+from .models import Meeting, MeetingParticipant
+
+
+def _cache_key(meeting_id, user_id):
+    return f'meeting_access:{meeting_id}:{user_id}'
+
+
+def cache_is_shared():
+    """Whether the default cache, and so its invalidations, is shared between processes"""
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def _query_meeting_access(meeting_id, user_id):
+    """Answer the access check with a single query on the (meeting, user) index"""
+    return Meeting.objects.filter(id=meeting_id).filter(
+        Q(host_id=user_id) |
+        Q(Exists(MeetingParticipant.objects.filter(meeting_id=OuterRef('pk'), user_id=user_id)))
+    ).exists()
+
+
+def has_meeting_access(meeting_id, user):
+    """Return True if the user is the host or a participant of the meeting"""
+    if not user.is_authenticated:
+        return False
+    try:
+        meeting_id = int(meeting_id)
+    except (TypeError, ValueError):
+        return False
+
+    if not cache_is_shared():
+        return _query_meeting_access(meeting_id, user.id)
+    key = _cache_key(meeting_id, user.id)
+    allowed = cache.get(key)
+    if allowed is None:
+        allowed = _query_meeting_access(meeting_id, user.id)
+        cache.set(key, allowed, settings.MEETING_ACCESS_CACHE_TIMEOUT)
+    return allowed
+
+
+async def ahas_meeting_access(meeting_id, user):
+    """Async variant of has_meeting_access that only hits the database on a cache miss"""
+    if not user.is_authenticated:
+        return False
+    try:
+        meeting_id = int(meeting_id)
+    except (TypeError, ValueError):
+        return False
+
+    if not cache_is_shared():
+        return await database_sync_to_async(_query_meeting_access)(meeting_id, user.id)
+    key = _cache_key(meeting_id, user.id)
+    allowed = await cache.aget(key)
+    if allowed is None:
+        allowed = await database_sync_to_async(_query_meeting_access)(meeting_id, user.id)
+        await cache.aset(key, allowed, settings.MEETING_ACCESS_CACHE_TIMEOUT)
+    return allowed
+
+
+def invalidate_meeting_access(meeting_id, *user_ids):
+    """Drop cached access answers for the given users of a meeting"""
+    cache.delete_many([_cache_key(meeting_id, user_id) for user_id in user_ids if user_id is not None])
+
+
+def accessible_meetings(user):
+    """Return a queryset of the meetings the user hosts or participates in"""
+    return Meeting.objects.filter(
+        Q(host=user) |
+        Q(Exists(MeetingParticipant.objects.filter(meeting_id=OuterRef('pk'), user=user)))
+    )
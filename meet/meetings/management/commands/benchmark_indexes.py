@@ -0,0 +1,179 @@
+"""
+Benchmark the hot chat and notification queries against the composite
+indexes.
+
+Seeds a throwaway test database, times each query with the indexes declared
+on the models ("after"), then swaps them for the single-column foreign key
+indexes the tables used to have ("before") and times them again, e.g.
+
+    python manage.py benchmark_indexes --messages 2000000 --notifications 5000000
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Index, Q
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+import random
+import statistics
+import time
+
+from chat.models import ChatMessage, SharedFile
+from meetings.models import Meeting, MeetingParticipant
+from notifications.models import Notification
+
+User = get_user_model()
+
+# Models whose Meta.indexes are benchmarked, with the foreign key that had a
+# single-column index before them
+INDEXED_MODELS = [
+    (ChatMessage, 'meeting'),
+    (SharedFile, 'meeting'),
+    (Notification, 'recipient'),
+]
+
+
+class Command(BaseCommand):
+    help = 'Seed a test database and compare query times with and without the composite indexes'
+    # MeetingParticipant is not swapped: the (meeting, user) unique
+    # constraint already served the access check before these indexes
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2000, help='Number of users')
+        parser.add_argument('--meetings', type=int, default=2000, help='Number of meetings')
+        parser.add_argument('--participants', type=int, default=10, help='Participants per meeting')
+        parser.add_argument('--messages', type=int, default=500000, help='Number of chat messages')
+        parser.add_argument('--notifications', type=int, default=1000000, help='Number of notifications')
+        parser.add_argument('--repeat', type=int, default=50, help='Runs per query (median is reported)')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            start = time.perf_counter()
+            users, meetings = self.seed(options)
+            self.stdout.write(f'Seeded in {time.perf_counter() - start:.1f}s')
+
+            self.analyze()
+            queries = self.queries(users, meetings)
+            self.measure(queries, 1)  # warm up
+            after = self.measure(queries, options['repeat'])
+            self.swap_indexes(before=True)
+            before = self.measure(queries, options['repeat'])
+            self.swap_indexes(before=False)
+            self.report(queries, before, after, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def seed(self, options):
+        """Create users, meetings, participants, messages and notifications in bulk"""
+        rng = random.Random(0)
+        users = []
+        for i in range(options['users']):
+            user = User(email=f'bench{i}@unio.app', username=f'bench{i}')
+            user.set_unusable_password()
+            users.append(user)
+        users = User.objects.bulk_create(users, batch_size=5000)
+        user_ids = [user.id for user in users]
+
+        meetings = Meeting.objects.bulk_create([
+            Meeting(title=f'Benchmark {i}', host_id=rng.choice(user_ids), scheduled_at=timezone.now())
+            for i in range(options['meetings'])
+        ], batch_size=5000)
+        meeting_ids = [meeting.id for meeting in meetings]
+
+        MeetingParticipant.objects.bulk_create([
+            MeetingParticipant(meeting_id=meeting_id, user_id=user_id)
+            for meeting_id in meeting_ids
+            for user_id in rng.sample(user_ids, min(options['participants'], len(user_ids)))
+        ], batch_size=5000, ignore_conflicts=True)
+
+        self.bulk_seed(ChatMessage, options['messages'], lambda: ChatMessage(
+            meeting_id=rng.choice(meeting_ids), sender_id=rng.choice(user_ids), message='Benchmark message'
+        ))
+        types = [choice for choice, _ in Notification.NOTIFICATION_TYPES]
+        self.bulk_seed(Notification, options['notifications'], lambda: Notification(
+            recipient_id=rng.choice(user_ids), title='Benchmark', message='Benchmark notification',
+            notification_type=rng.choice(types), is_read=rng.random() < 0.9
+        ))
+        return user_ids, meeting_ids
+
+    def bulk_seed(self, model, count, make, chunk=20000):
+        for offset in range(0, count, chunk):
+            model.objects.bulk_create([make() for _ in range(min(chunk, count - offset))])
+            self.stdout.write(f'  {model.__name__}: {min(offset + chunk, count)}/{count}', ending='\r')
+        self.stdout.write('')
+
+    def queries(self, users, meetings):
+        """The queries issued by chat.views and notifications.views"""
+        user_id, meeting_id = users[len(users) // 2], meetings[len(meetings) // 2]
+        cursor = ChatMessage.objects.filter(meeting_id=meeting_id).order_by('created_at', 'id')[
+            ChatMessage.objects.filter(meeting_id=meeting_id).count() // 2
+        ]
+        return [
+            ('chat: latest page', lambda: list(
+                ChatMessage.objects.filter(meeting_id=meeting_id).order_by('-created_at', '-id')[:51]
+            )),
+            ('chat: messages after cursor', lambda: list(
+                ChatMessage.objects.filter(meeting_id=meeting_id).filter(
+                    Q(created_at__gt=cursor.created_at) | Q(created_at=cursor.created_at, id__gt=cursor.id)
+                ).order_by('created_at', 'id')[:51]
+            )),
+            ('files: meeting list', lambda: list(SharedFile.objects.filter(meeting_id=meeting_id))),
+            ('notifications: list', lambda: list(Notification.objects.filter(recipient_id=user_id))),
+            ('notifications: unread', lambda: list(
+                Notification.objects.filter(recipient_id=user_id, is_read=False)
+            )),
+            ('notifications: by type', lambda: list(
+                Notification.objects.filter(recipient_id=user_id, notification_type='message')
+            )),
+            ('notifications: unread count', lambda: Notification.objects.filter(
+                recipient_id=user_id, is_read=False
+            ).count()),
+        ]
+
+    def measure(self, queries, repeat):
+        """Return the median milliseconds of each query"""
+        results = []
+        for _, query in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                timings.append(time.perf_counter() - start)
+            results.append(statistics.median(timings) * 1000)
+        return results
+
+    def swap_indexes(self, before):
+        """Replace the composite indexes with single-column foreign key indexes, or back"""
+        with connection.schema_editor() as editor:
+            for model, field in INDEXED_MODELS:
+                fk_index = Index(fields=[field], name=f'bench_{model._meta.model_name}_{field}_idx')
+                if before:
+                    editor.add_index(model, fk_index)
+                for index in model._meta.indexes:
+                    (editor.remove_index if before else editor.add_index)(model, index)
+                if not before:
+                    editor.remove_index(model, fk_index)
+        self.analyze()
+
+    def analyze(self):
+        """Refresh planner statistics so the new indexes are considered"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def report(self, queries, before, after, options):
+        self.stdout.write(self.style.SUCCESS('=' * 72))
+        self.stdout.write(self.style.SUCCESS(
+            f"Index benchmark ({options['messages']} messages, {options['notifications']} notifications, "
+            f"{connection.vendor})"
+        ))
+        self.stdout.write(self.style.SUCCESS('=' * 72))
+        self.stdout.write(f"{'query':<32} | {'before ms':>10} | {'after ms':>10} | {'speedup':>8}")
+        self.stdout.write('-' * 72)
+        for (name, _), old, new in zip(queries, before, after):
+            speedup = old / new if new else 0
+            self.stdout.write(f'{name:<32} | {old:>10.3f} | {new:>10.3f} | {speedup:>7.1f}x')
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-17 22:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('meetings', '0002_meeting_action_items_meeting_ai_summary_and_more'),
+    ]
+
+    operations = [
+        # The (meeting, user) unique constraint already indexes meeting
+        migrations.AlterField(
+            model_name='meetingparticipant',
+            name='meeting',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='participants', to='meetings.meeting'),
+        ),
+    ]
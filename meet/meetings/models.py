@@ -42,7 +42,8 @@ class Meeting(models.Model):
 
 
 class MeetingParticipant(models.Model):
-    meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE, related_name='participants')
+    # Indexed by the (meeting, user) unique constraint
+    meeting = models.ForeignKey(Meeting, on_delete=models.CASCADE, related_name='participants', db_index=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='meeting_participations')
     joined_at = models.DateTimeField(auto_now_add=True)
     left_at = models.DateTimeField(null=True, blank=True)
@@ -0,0 +1,61 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .access import invalidate_meeting_access
+from .models import Meeting, MeetingInvite, MeetingParticipant
+from .versions import bump_version
+
+
+@receiver(pre_save, sender=Meeting)
+def remember_previous_host(sender, instance, **kwargs):
+    """Keep the stored host so a host change can invalidate both users"""
+    instance._previous_host_id = None
+    if instance.pk:
+        instance._previous_host_id = (
+            Meeting.objects.filter(pk=instance.pk).values_list('host_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Meeting)
+def invalidate_host_access(sender, instance, created, **kwargs):
+    """Drop cached access for the old and new host when the host changes"""
+    previous_host_id = getattr(instance, '_previous_host_id', None)
+    if created or previous_host_id != instance.host_id:
+        invalidate_meeting_access(instance.pk, previous_host_id, instance.host_id)
+
+
+@receiver(post_delete, sender=Meeting)
+def invalidate_deleted_meeting_access(sender, instance, **kwargs):
+    """Drop cached host access for a deleted meeting"""
+    invalidate_meeting_access(instance.pk, instance.host_id)
+
+
+@receiver(post_save, sender=MeetingParticipant)
+@receiver(post_delete, sender=MeetingParticipant)
+def invalidate_participant_access(sender, instance, **kwargs):
+    """Drop cached access when a user joins or leaves a meeting's participants"""
+    invalidate_meeting_access(instance.meeting_id, instance.user_id)
+
+
+def bump_meeting_lists(meeting_id, *user_ids):
+    """Mark the meeting lists of a meeting's host and participants as changed"""
+    user_ids = set(user_ids)
+    user_ids.update(MeetingParticipant.objects.filter(meeting_id=meeting_id).values_list('user_id', flat=True))
+    user_ids.update(Meeting.objects.filter(pk=meeting_id).values_list('host_id', flat=True))
+    bump_version('meetings', *user_ids)
+
+
+@receiver(post_save, sender=Meeting)
+@receiver(post_delete, sender=Meeting)
+def bump_meeting_versions(sender, instance, **kwargs):
+    """A meeting changed: everyone listing it must refetch"""
+    bump_meeting_lists(instance.pk, instance.host_id, getattr(instance, '_previous_host_id', None))
+
+
+@receiver(post_save, sender=MeetingParticipant)
+@receiver(post_delete, sender=MeetingParticipant)
+@receiver(post_save, sender=MeetingInvite)
+@receiver(post_delete, sender=MeetingInvite)
+def bump_member_versions(sender, instance, **kwargs):
+    """Participants and invites are nested in the meeting list"""
+    bump_meeting_lists(instance.meeting_id, getattr(instance, 'user_id', None))
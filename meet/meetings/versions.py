@@ -0,0 +1,84 @@
+"""
+Change versions for conditional GET on polled list endpoints.
+
+Every polled list has a version stamp in the cache, the time.time() of its
+last change:
+
+    ('chat', meeting_id)            messages of a meeting
+    ('files', meeting_id)           shared files of a meeting
+    ('meetings', user_id)           a user's meeting list
+    ('notifications', user_id)      a user's notifications
+
+Writers bump the stamp (signal handlers, or explicitly where rows are
+written with bulk_create/update, which send no signals). The
+conditional_on_version decorator turns the stamp into an ETag and a
+Last-Modified date, so an unchanged list answers 304 Not Modified without
+querying or serializing anything. A stamp missing from the cache is
+recreated, which costs clients one full response.
+
+Stamps are bumped by every process, including the WebSocket server, so
+they only mean anything in a shared cache (CACHE_URL). With the default
+per-process LocMemCache, a change made in another process would leave
+clients with 304s for a stale list, so conditional GETs are not answered
+at all and every request gets a full response.
+"""
+
+from django.core.cache import cache
+from django.views.decorators.http import condition
+from datetime import datetime, timezone as dt_timezone
+import hashlib
+import math
+import time
+
+from .access import cache_is_shared
+
+
+def _cache_key(scope, object_id):
+    return f'version:{scope}:{object_id}'
+
+
+def get_version(scope, object_id):
+    """Return the current version stamp of a scope, creating it if missing"""
+    key = _cache_key(scope, object_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(scope, *object_ids):
+    """Mark scopes as changed"""
+    now = time.time()
+    cache.set_many({_cache_key(scope, object_id): now for object_id in object_ids if object_id is not None}, None)
+
+
+def conditional_on_version(version_func):
+    """
+    Decorator for GET views answering 304 Not Modified while a version is
+    unchanged. `version_func(request, *args, **kwargs)` returns the view's
+    version stamp (see get_version), or None to skip conditional handling,
+    e.g. when the user may not see the resource. Without a shared cache
+    every request gets a full response.
+    """
+    def version(request, *args, **kwargs):
+        if not hasattr(request, '_version'):
+            request._version = version_func(request, *args, **kwargs) if cache_is_shared() else None
+        return request._version
+
+    def etag(request, *args, **kwargs):
+        stamp = version(request, *args, **kwargs)
+        if stamp is None:
+            return None
+        # Responses differ per user and per query string
+        return hashlib.md5(f'{stamp}:{request.user.id}:{request.get_full_path()}'.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        stamp = version(request, *args, **kwargs)
+        # HTTP dates have one second resolution: only announce a date once
+        # its second is over, so any later change gets a later date
+        if stamp is None or time.time() < math.floor(stamp) + 1:
+            return None
+        return datetime.fromtimestamp(math.floor(stamp), tz=dt_timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -6,11 +6,13 @@ from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from django.db import models
+from django.utils.decorators import method_decorator
 from .models import Meeting, MeetingParticipant, MeetingInvite
 from .serializers import (
     MeetingSerializer, MeetingCreateSerializer, MeetingUpdateSerializer,
     SendInviteSerializer
 )
+from .versions import conditional_on_version, get_version
 
 User = get_user_model()
 
@@ -41,6 +43,7 @@ class MeetingViewSet(viewsets.ModelViewSet):
             models.Q(host=user) | models.Q(participants__user=user)
         ).distinct()
     
+    @method_decorator(conditional_on_version(lambda request: get_version('meetings', request.user.id)))
     def list(self, request):
         """Get all meetings for the logged-in user."""
         queryset = self.get_queryset()
@@ -14,7 +14,8 @@ class Notification(models.Model):
         ('general', 'General'),
     ]
     
-    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    # Indexed by the composite indexes below, which all lead with recipient
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications', db_index=False)
     title = models.CharField(max_length=255)
     message = models.TextField()
     notification_type = models.CharField(max_length=50, choices=NOTIFICATION_TYPES, default='general')
@@ -31,6 +32,18 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Notification list, newest first
+            models.Index(fields=['recipient', '-created_at'], name='notif_recipient_created_idx'),
+            # Notification list filtered by type
+            models.Index(fields=['recipient', 'notification_type', '-created_at'], name='notif_recipient_type_idx'),
+            # Unread list and mark-all-as-read; only covers the unread rows
+            models.Index(
+                fields=['recipient', '-created_at'],
+                name='notif_unread_idx',
+                condition=models.Q(is_read=False)
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.recipient.email}"
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from meetings.versions import bump_version
+
+from .models import Notification
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_notifications_version(sender, instance, **kwargs):
+    """A notification was created, read or deleted"""
+    bump_version('notifications', instance.recipient_id)
@@ -8,6 +8,7 @@ from django.utils import timezone
 from .models import Notification
 from .serializers import NotificationSerializer, SendNotificationSerializer
 from meetings.models import Meeting
+from meetings.versions import bump_version, conditional_on_version, get_version
 
 User = get_user_model()
 
@@ -58,6 +59,7 @@ def send_notification(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_on_version(lambda request: get_version('notifications', request.user.id))
 def get_notifications(request):
     """
     Fetch user notifications.
@@ -115,6 +117,9 @@ def mark_all_as_read(request):
         is_read=True,
         read_at=timezone.now()
     )
+    # update() sends no post_save, see notifications.signals
+    if updated:
+        bump_version('notifications', user.id)
     
     return Response({
         'message': f'{updated} notifications marked as read'
@@ -0,0 +1,174 @@
+"""
+Batched persistence of chat messages sent over the meeting socket.
+
+Chat frames are broadcast to the room as soon as they arrive; the matching
+ChatMessage rows are only queued here and written with one bulk_create every
+CHAT_PERSIST_INTERVAL seconds, or as soon as CHAT_PERSIST_BATCH_SIZE messages
+are pending. A busy room therefore costs one INSERT per batch instead of one
+per message, and database latency never delays delivery.
+
+A message's uuid and created_at are set before it is broadcast and stored
+as they are, so clients can match socket frames to the history API. A batch
+that hits an integrity error (e.g. its meeting was deleted meanwhile) is
+inserted row by row, dropping only the rows that fail. A batch failing
+otherwise (e.g. the database is unreachable) is retried with the next one,
+up to CHAT_PERSIST_ATTEMPTS times, and whatever is pending when the process exits
+normally is written by an atexit hook. Messages still pending when the
+process is killed are lost, so keep the interval short.
+"""
+
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from collections import Counter
+import asyncio
+import atexit
+import logging
+
+from chat.models import ChatMessage
+from meetings.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+
+class ChatLogWriter:
+    """Per-process queue of ChatMessage rows waiting to be bulk inserted"""
+
+    def __init__(self, interval, batch_size):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.stats = Counter()
+        self._pending = []
+        self._flush_task = None
+        self._flush_now = False
+        self._failures = 0
+
+    def add(self, message):
+        """Queue an unsaved ChatMessage for the next batch"""
+        self._pending.append(message)
+        if len(self._pending) >= self.batch_size:
+            self._schedule(0)
+        else:
+            self._schedule(self.interval)
+
+    def _schedule(self, delay):
+        loop = asyncio.get_running_loop()
+        task = self._flush_task
+        if task is not None and not task.done() and task.get_loop() is loop:
+            # Keep the scheduled flush unless a full batch must go out now
+            if delay or self._flush_now:
+                return
+            task.cancel()
+        self._flush_task = loop.create_task(self._flush_later(delay))
+        self._flush_now = not delay
+
+    async def _flush_later(self, delay):
+        if delay:
+            await asyncio.sleep(delay)
+        self._flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        """Write every pending message in one bulk_create"""
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await database_sync_to_async(self._insert)(batch)
+        except Exception:
+            self._failures += 1
+            if self._failures < settings.CHAT_PERSIST_ATTEMPTS:
+                logger.warning(f"Failed to persist {len(batch)} chat messages, retrying", exc_info=True)
+                self._pending[:0] = batch
+                self._schedule(self.interval)
+                return
+            logger.exception(f"Failed to persist {len(batch)} chat messages, dropping them")
+            self.stats['failed'] += len(batch)
+            self._failures = 0
+            return
+        self._failures = 0
+
+    def flush_sync(self):
+        """Write every pending message from outside the event loop, e.g. at exit"""
+        batch, self._pending = self._pending, []
+        if batch:
+            self._insert(batch)
+
+    def _insert(self, batch):
+        """
+        Insert a batch, leaving in `batch` only the messages still to be
+        retried if an error other than an integrity error is raised
+        """
+        try:
+            # All or nothing, so a failed batch can be retried as a whole
+            with transaction.atomic():
+                ChatMessage.objects.bulk_create(batch)
+            stored = list(batch)
+        except IntegrityError:
+            stored = self._insert_rows(batch)
+        # bulk_create sends no post_save, see chat.signals
+        bump_version('chat', *{message.meeting_id for message in stored})
+        self.stats['batches'] += 1
+        self.stats['messages'] += len(stored)
+
+    def _insert_rows(self, batch):
+        """Insert a batch one message at a time, dropping the messages that break a constraint"""
+        stored = []
+        while batch:
+            message = batch[0]
+            try:
+                with transaction.atomic():
+                    ChatMessage.objects.bulk_create([message])
+            except IntegrityError:
+                logger.warning(
+                    f"Dropping chat message {message.uuid} of meeting {message.meeting_id}", exc_info=True
+                )
+                self.stats['failed'] += 1
+            else:
+                stored.append(message)
+            # Anything else propagates with the rest of the batch left to retry
+            del batch[0]
+        return stored
+
+
+def chat_frame(sender, message):
+    """Build the chat frame broadcast to a meeting room for a ChatMessage"""
+    return {
+        'type': 'chat',
+        'uuid': str(message.uuid),
+        'sender_id': sender.id,
+        'sender_username': sender.username,
+        'sender_email': sender.email,
+        'message': message.message,
+        'created_at': message.created_at.isoformat(),
+    }
+
+
+async def broadcast_chat(meeting_id, frames):
+    """
+    Deliver chat frames to the clients connected to a meeting's socket.
+    All frames go in one event, which each consumer fans out, so a bulk send
+    takes one slot of every channel's CHANNEL_LAYER_CAPACITY.
+    """
+    channel_layer = get_channel_layer()
+    await channel_layer.group_send(
+        f'meeting_{meeting_id}',
+        {
+            'type': 'chat_messages',
+            'frames': frames
+        }
+    )
+
+
+_chat_log = None
+
+
+def get_chat_log():
+    """Return this process's ChatLogWriter"""
+    global _chat_log
+
+    if _chat_log is None:
+        _chat_log = ChatLogWriter(settings.CHAT_PERSIST_INTERVAL, settings.CHAT_PERSIST_BATCH_SIZE)
+        atexit.register(_chat_log.flush_sync)
+    return _chat_log
@@ -0,0 +1,117 @@
+"""
+Wire formats for the meeting WebSocket.
+
+Clients pick a format through the WebSocket subprotocol at connect time:
+
+    unio.json          - plain JSON text frames (default, also used when no
+                         subprotocol is requested)
+    unio.compact-json  - JSON text frames with short top-level keys, encoded
+                         with orjson when it is installed
+    unio.msgpack       - MessagePack binary frames with short top-level keys
+
+Only top-level keys are shortened; payloads such as SDP offers and ICE
+candidates are passed through untouched.
+"""
+
+import json
+
+import msgpack
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+# Top-level keys shortened by the compact formats
+COMPACT_KEYS = {
+    'type': 't',
+    'message': 'm',
+    'offer': 'o',
+    'answer': 'a',
+    'candidate': 'c',
+    'candidates': 'cs',
+    'sender_id': 's',
+    'sender_username': 'su',
+    'target_id': 'to',
+    'user_id': 'u',
+    'username': 'un',
+    'email': 'e',
+    'timestamp': 'ts',
+}
+EXPANDED_KEYS = {short: key for key, short in COMPACT_KEYS.items()}
+
+
+def compact_keys(content):
+    return {COMPACT_KEYS.get(key, key): value for key, value in content.items()}
+
+
+def expand_keys(content):
+    return {EXPANDED_KEYS.get(key, key): value for key, value in content.items()}
+
+
+class JsonCodec:
+    """Plain JSON text frames, identical to AsyncJsonWebsocketConsumer"""
+
+    subprotocol = 'unio.json'
+    binary = False
+
+    def encode(self, content):
+        return json.dumps(content)
+
+    def decode(self, data):
+        return json.loads(data)
+
+
+class CompactJsonCodec:
+    """JSON text frames with short keys, using orjson when available"""
+
+    subprotocol = 'unio.compact-json'
+    binary = False
+
+    def encode(self, content):
+        if orjson is not None:
+            return orjson.dumps(compact_keys(content)).decode('utf8')
+        return json.dumps(compact_keys(content), separators=(',', ':'))
+
+    def decode(self, data):
+        content = orjson.loads(data) if orjson is not None else json.loads(data)
+        if not isinstance(content, dict):
+            raise ValueError('Message must be an object')
+        return expand_keys(content)
+
+
+class MsgpackCodec:
+    """MessagePack binary frames with short keys"""
+
+    subprotocol = 'unio.msgpack'
+    binary = True
+
+    def encode(self, content):
+        return msgpack.packb(compact_keys(content), use_bin_type=True)
+
+    def decode(self, data):
+        if isinstance(data, str):
+            raise ValueError('MessagePack messages must be sent as binary frames')
+        try:
+            content = msgpack.unpackb(data, raw=False)
+        except msgpack.UnpackException as e:
+            raise ValueError(str(e))
+        if not isinstance(content, dict):
+            raise ValueError('Message must be a map')
+        return expand_keys(content)
+
+
+CODECS = {codec.subprotocol: codec for codec in (JsonCodec(), CompactJsonCodec(), MsgpackCodec())}
+DEFAULT_CODEC = CODECS[JsonCodec.subprotocol]
+
+
+def select_codec(subprotocols):
+    """
+    Return the first codec among the client's requested subprotocols,
+    or None if it requested none we support.
+    """
+    for subprotocol in subprotocols or []:
+        if subprotocol in CODECS:
+            return CODECS[subprotocol]
+    return None
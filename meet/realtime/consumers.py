@@ -1,8 +1,26 @@
-from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.utils import timezone
+from urllib.parse import parse_qs
+import asyncio
 import json
 import logging
+import time
+
+from chat.models import ChatMessage
+from chat.pagination import decode_cursor
+from chat.unread import mark_read, unread_count
+from meetings.access import ahas_meeting_access
+
+from .chatlog import chat_frame, get_chat_log
+from .codecs import DEFAULT_CODEC, select_codec
+from .messages import MESSAGE_HANDLERS, SDP, TIMESTAMP, Field, message_handler
+from .outbound import OutboundQueue
+from .presence import get_presence_store
+from .ratelimit import TokenBucket, get_room_limiter
+from .registry import get_channel_registry
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
@@ -11,7 +29,40 @@ logger = logging.getLogger(__name__)
 class MeetingConsumer(AsyncJsonWebsocketConsumer):
     """
     WebSocket consumer for handling WebRTC signaling in meetings.
-    Supports: offer, answer, ice-candidate, join-call, leave-call messages
+    Supports: offer, answer, ice-candidate, join-call, leave-call, heartbeat,
+    mute, screen-share, raise-hand, reaction, chat and read messages,
+    dispatched through the registry in realtime.messages
+    
+    ICE candidates are coalesced per target for SIGNALING_ICE_BATCH_WINDOW
+    seconds (or until SIGNALING_ICE_BATCH_SIZE candidates) and travel the
+    channel layer as one event. Clients that connect with ?ice_batch=1
+    receive them as a single ice-candidates frame, others as individual
+    ice-candidate frames.
+    
+    The wire format is negotiated through the WebSocket subprotocol
+    (unio.json, unio.compact-json or unio.msgpack, see realtime.codecs);
+    plain JSON is used when the client requests none.
+    
+    On connect the client receives a presence snapshot of everyone in the
+    room; user_joined/user_left frames are the deltas. Clients opt into
+    liveness checks by sending a heartbeat, then should send one every
+    PRESENCE_HEARTBEAT_INTERVAL seconds (any message counts); their sockets
+    are closed (code 4008) and dropped from the roster after PRESENCE_TIMEOUT
+    seconds of silence. Clients that never heartbeat stay until they
+    disconnect.
+    
+    Outgoing frames go through a bounded, prioritised per-connection queue
+    (see realtime.outbound) drained by a writer task, so a slow client cannot
+    stall the consumer or grow memory without limit.
+    
+    Chat messages are broadcast to the room immediately and persisted in
+    batches by realtime.chatlog. The client's unread chat count is pushed as
+    an unread frame on connect and whenever its read cursor moves (read
+    messages on this socket or chat.views.mark_messages_read).
+    
+    Signaling, control and chat messages are rate limited per connection and per
+    meeting (see realtime.ratelimit); excess messages are rejected with a
+    rate_limited error frame.
     """
     
     async def connect(self):
@@ -19,6 +70,24 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
         self.meeting_id = self.scope['url_route']['kwargs']['meeting_id']
         self.room_group_name = f'meeting_{self.meeting_id}'
         self.user = self.scope['user']
+        self.registry = get_channel_registry(self.channel_layer)
+        self.presence = get_presence_store(self.channel_layer)
+        self.joined = False
+        self.heartbeats = False
+        self.presence_refreshed_at = 0
+        self.subprotocol_codec = select_codec(self.scope.get('subprotocols'))
+        self.codec = self.subprotocol_codec or DEFAULT_CODEC
+        
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.ice_batch = query.get('ice_batch', ['0'])[0] in ('1', 'true')
+        self.ice_batch_window = settings.SIGNALING_ICE_BATCH_WINDOW
+        self.ice_batch_size = settings.SIGNALING_ICE_BATCH_SIZE
+        self.ice_buffers = {}
+        self.ice_flush_tasks = {}
+        self.outbound = OutboundQueue(settings.WEBSOCKET_SEND_QUEUE_SIZE, merge_ice=self.ice_batch)
+        self.writer_task = None
+        self.rate_limit = TokenBucket(settings.SIGNALING_CONNECTION_RATE, settings.SIGNALING_CONNECTION_BURST)
+        self.room_rate_limit = get_room_limiter(self.channel_layer)
         
         # Check if user is authenticated
         if not self.user.is_authenticated:
@@ -38,10 +107,24 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             self.room_group_name,
             self.channel_name
         )
+        await self.registry.register(self.meeting_id, self.user.id, self.channel_name)
         
-        await self.accept()
+        await self.accept(
+            subprotocol=self.subprotocol_codec.subprotocol if self.subprotocol_codec else None
+        )
+        self.writer_task = asyncio.create_task(self.write_outbound())
         logger.info(f"User {self.user.id} connected to meeting {self.meeting_id}")
         
+        # Send the current roster, then announce ourselves as a delta
+        await self.presence.join(self.meeting_id, self.get_user_info(), self.channel_name)
+        self.presence_refreshed_at = time.monotonic()
+        self.joined = True
+        await self.send_json({
+            'type': 'presence',
+            'participants': await self.presence.snapshot(self.meeting_id)
+        })
+        await self.send_unread_count(await database_sync_to_async(unread_count)(self.user.id, self.meeting_id))
+        
         # Notify others that a new user joined
         await self.channel_layer.group_send(
             self.room_group_name,
@@ -55,131 +138,339 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Handle WebSocket disconnection"""
-        if self.user.is_authenticated:
-            # Notify others that user left
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    'type': 'user_left',
-                    'user_id': self.user.id,
-                    'username': self.user.username
-                }
-            )
+        if self.joined:
+            # Deliver candidates still waiting for their batch window
+            for target_id in list(self.ice_buffers):
+                await self.flush_ice_candidates(target_id)
+            
+            # Notify others that user left, unless another connection of
+            # the same user is still present or the entry already expired
+            left = await self.presence.leave(self.meeting_id, self.user.id, self.channel_name)
+            if left:
+                await self.channel_layer.group_send(
+                    self.room_group_name,
+                    {
+                        'type': 'user_left',
+                        'user_id': self.user.id,
+                        'username': self.user.username
+                    }
+                )
             
+            await self.registry.unregister(self.meeting_id, self.user.id, self.channel_name)
             logger.info(f"User {self.user.id} disconnected from meeting {self.meeting_id}")
         
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+            if self.outbound.stats['dropped'] or self.outbound.stats['superseded']:
+                logger.info(
+                    f"User {self.user.id} outbound queue in meeting {self.meeting_id}: "
+                    f"{dict(self.outbound.stats)}"
+                )
+        
         # Leave room group
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
     
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        """Decode an incoming frame with the negotiated wire format"""
+        try:
+            content = self.codec.decode(text_data if text_data is not None else bytes_data)
+        except (TypeError, ValueError):
+            await self.send_json({
+                'type': 'error',
+                'message': f'Invalid message format, expected {self.codec.subprotocol}'
+            })
+            return
+        await self.receive_json(content, **kwargs)
+    
+    async def send_json(self, content, close=False):
+        """
+        Queue an outgoing message for the writer task. Frames sent before
+        the connection is accepted, or that close it, are written directly.
+        """
+        if close or self.writer_task is None:
+            await self.write_frame(content, close=close)
+            return
+        self.outbound.put(content)
+    
+    async def write_outbound(self):
+        """Drain the outbound queue onto the socket"""
+        while True:
+            content = await self.outbound.get()
+            try:
+                await self.write_frame(content)
+            except Exception:
+                # Keep draining: one bad frame must not leave the socket deaf
+                logger.exception(f"Error writing to socket in meeting {self.meeting_id}")
+    
+    async def write_frame(self, content, close=False):
+        """Encode an outgoing message with the negotiated wire format"""
+        if self.codec.binary:
+            await self.send(bytes_data=self.codec.encode(content), close=close)
+        else:
+            await self.send(text_data=self.codec.encode(content), close=close)
+    
     async def receive_json(self, content):
         """
         Handle incoming WebSocket messages.
-        Supports WebRTC signaling messages: offer, answer, ice-candidate, join-call, leave-call
+        Validates the payload against the registered message type, applies
+        rate limits and dispatches to its handler.
         """
-        try:
-            message_type = content.get('type')
-            
-            if not message_type:
-                await self.send_json({
-                    'type': 'error',
-                    'message': 'Message type is required'
-                })
-                return
-            
-            if message_type == 'offer':
-                await self.handle_offer(content)
-            elif message_type == 'answer':
-                await self.handle_answer(content)
-            elif message_type == 'ice-candidate':
-                await self.handle_ice_candidate(content)
-            elif message_type == 'join-call':
-                await self.handle_join_call(content)
-            elif message_type == 'leave-call':
-                await self.handle_leave_call(content)
-            else:
-                await self.send_json({
-                    'type': 'error',
-                    'message': f'Unknown message type: {message_type}'
-                })
-                
-        except Exception as e:
-            logger.error(f"Error handling message in meeting {self.meeting_id}: {str(e)}")
+        if not isinstance(content, dict):
             await self.send_json({
                 'type': 'error',
-                'message': 'Internal server error processing your message'
+                'message': 'Message must be an object'
             })
-    
-    async def handle_offer(self, content):
-        """Handle WebRTC offer"""
-        offer = content.get('offer')
-        target_id = content.get('target_id')  # Specific peer to send to
+            return
         
-        if not offer:
+        message_type = content.get('type')
+        await self.refresh_presence()
+        
+        if not message_type:
             await self.send_json({
                 'type': 'error',
-                'message': 'Offer data is required'
+                'message': 'Message type is required'
             })
             return
         
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'webrtc_offer',
-                'offer': offer,
-                'sender_id': self.user.id,
-                'sender_username': self.user.username,
-                'target_id': target_id
-            }
-        )
-    
-    async def handle_answer(self, content):
-        """Handle WebRTC answer"""
-        answer = content.get('answer')
-        target_id = content.get('target_id')
+        spec = MESSAGE_HANDLERS.get(message_type)
+        if spec is None:
+            await self.send_json({
+                'type': 'error',
+                'message': f'Unknown message type: {message_type}'
+            })
+            return
         
-        if not answer:
+        error = spec.validate(content)
+        if error:
             await self.send_json({
                 'type': 'error',
-                'message': 'Answer data is required'
+                'message': error
             })
             return
         
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                'type': 'webrtc_answer',
-                'answer': answer,
-                'sender_id': self.user.id,
-                'sender_username': self.user.username,
-                'target_id': target_id
-            }
-        )
+        if spec.rate_limited and not await self.check_rate_limit(message_type):
+            return
+        
+        try:
+            await spec.handler(self, content)
+        except Exception:
+            logger.exception(f"Error handling {message_type} message in meeting {self.meeting_id}")
+            await self.send_json({
+                'type': 'error',
+                'message': 'Internal server error processing your message'
+            })
+    
+    async def check_rate_limit(self, message_type):
+        """
+        Spend a token from this connection's and this meeting's buckets.
+        Sends a rate_limited error frame and returns False if either is empty.
+        """
+        if not self.rate_limit.consume():
+            scope = 'connection'
+            retry_after = self.rate_limit.retry_after()
+        elif not await self.room_rate_limit.consume(self.meeting_id):
+            scope = 'meeting'
+            retry_after = 1 / self.room_rate_limit.rate
+        else:
+            return True
+        
+        await self.send_json({
+            'type': 'error',
+            'code': 'rate_limited',
+            'message': f'Rate limit exceeded for this {scope}, {message_type} message rejected',
+            'retry_after': round(retry_after, 3)
+        })
+        return False
+    
+    @message_handler(
+        'offer',
+        Field('offer', SDP, error='Offer data is required'),
+        Field('target_id', int, required=False),
+        rate_limited=True
+    )
+    async def handle_offer(self, content):
+        """Handle WebRTC offer"""
+        offer = content['offer']
+        target_id = content.get('target_id')  # Specific peer to send to
+        
+        await self.send_signal({
+            'type': 'webrtc_offer',
+            'offer': offer,
+            'sender_id': self.user.id,
+            'sender_username': self.user.username,
+            'target_id': target_id
+        })
     
+    @message_handler(
+        'answer',
+        Field('answer', SDP, error='Answer data is required'),
+        Field('target_id', int, required=False),
+        rate_limited=True
+    )
+    async def handle_answer(self, content):
+        """Handle WebRTC answer"""
+        answer = content['answer']
+        target_id = content.get('target_id')
+        
+        await self.send_signal({
+            'type': 'webrtc_answer',
+            'answer': answer,
+            'sender_id': self.user.id,
+            'sender_username': self.user.username,
+            'target_id': target_id
+        })
+    
+    @message_handler(
+        'ice-candidate',
+        Field('candidate', SDP, error='ICE candidate data is required'),
+        Field('target_id', int, required=False),
+        rate_limited=True
+    )
     async def handle_ice_candidate(self, content):
         """Handle ICE candidate"""
-        candidate = content.get('candidate')
+        candidate = content['candidate']
         target_id = content.get('target_id')
         
-        if not candidate:
-            await self.send_json({
-                'type': 'error',
-                'message': 'ICE candidate data is required'
+        if self.ice_batch_window <= 0:
+            await self.send_signal({
+                'type': 'ice_candidate',
+                'candidate': candidate,
+                'sender_id': self.user.id,
+                'target_id': target_id
             })
             return
         
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
+        buffer = self.ice_buffers.setdefault(target_id, [])
+        buffer.append(candidate)
+        if len(buffer) >= self.ice_batch_size:
+            await self.flush_ice_candidates(target_id)
+        elif target_id not in self.ice_flush_tasks:
+            self.ice_flush_tasks[target_id] = asyncio.create_task(
+                self.flush_ice_candidates_later(target_id)
+            )
+    
+    async def flush_ice_candidates_later(self, target_id):
+        """Flush a target's ICE candidates once the batch window has passed"""
+        await asyncio.sleep(self.ice_batch_window)
+        self.ice_flush_tasks.pop(target_id, None)
+        try:
+            await self.flush_ice_candidates(target_id)
+        except Exception as e:
+            logger.error(f"Error flushing ICE candidates in meeting {self.meeting_id}: {str(e)}")
+    
+    async def flush_ice_candidates(self, target_id):
+        """Send the buffered ICE candidates for a target as one event"""
+        task = self.ice_flush_tasks.pop(target_id, None)
+        if task is not None:
+            task.cancel()
+        
+        candidates = self.ice_buffers.pop(target_id, None)
+        if not candidates:
+            return
+        
+        if len(candidates) == 1:
+            event = {
                 'type': 'ice_candidate',
-                'candidate': candidate,
+                'candidate': candidates[0],
                 'sender_id': self.user.id,
                 'target_id': target_id
             }
+        else:
+            event = {
+                'type': 'ice_candidates',
+                'candidates': candidates,
+                'sender_id': self.user.id,
+                'target_id': target_id
+            }
+        await self.send_signal(event)
+    
+    async def send_signal(self, event):
+        """
+        Deliver a signaling event straight to the target peer's channel,
+        or to the whole room when no target_id is given
+        """
+        target_id = event.get('target_id')
+        
+        # Keep candidates ordered before a later offer/answer to the same peer
+        if target_id in self.ice_buffers and event['type'] not in ('ice_candidate', 'ice_candidates'):
+            await self.flush_ice_candidates(target_id)
+        
+        if not target_id:
+            await self.channel_layer.group_send(self.room_group_name, event)
+            return
+        
+        target_channel = await self.registry.lookup(self.meeting_id, target_id)
+        if target_channel is None:
+            logger.debug(f"Dropping {event['type']} for user {target_id} not connected to meeting {self.meeting_id}")
+            return
+        
+        await self.channel_layer.send(target_channel, event)
+    
+    @message_handler('heartbeat', Field('timestamp', TIMESTAMP, required=False))
+    async def handle_heartbeat(self, content):
+        """Acknowledge a client heartbeat (presence was refreshed on receipt)"""
+        if not self.heartbeats:
+            # From now on this socket is swept if it goes silent
+            self.heartbeats = True
+            self.presence_refreshed_at = time.monotonic()
+            await self.presence.join(self.meeting_id, self.get_user_info(), self.channel_name, heartbeat=True)
+        await self.send_json({
+            'type': 'heartbeat-ack',
+            'timestamp': content.get('timestamp')
+        })
+    
+    async def refresh_presence(self):
+        """
+        Refresh this user's presence entry at most once per heartbeat
+        interval, and sweep out users whose sockets stopped heartbeating
+        """
+        now = time.monotonic()
+        if now - self.presence_refreshed_at < settings.PRESENCE_HEARTBEAT_INTERVAL:
+            return
+        self.presence_refreshed_at = now
+        
+        # Re-announce ourselves if we were swept out while stalled, or a
+        # newer connection of the same user has since left
+        rejoined = await self.presence.join(
+            self.meeting_id, self.get_user_info(), self.channel_name, heartbeat=self.heartbeats
         )
+        if rejoined:
+            # The sweep also took us out of the room group
+            await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+            await self.registry.register(self.meeting_id, self.user.id, self.channel_name)
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                dict(self.get_user_info(), type='user_joined')
+            )
+        
+        expired = await self.presence.expire(self.meeting_id, settings.PRESENCE_TIMEOUT)
+        for user_info, channel_name in expired:
+            logger.info(f"User {user_info['user_id']} timed out of meeting {self.meeting_id}")
+            await self.registry.unregister(self.meeting_id, user_info['user_id'], channel_name)
+            await self.channel_layer.group_discard(self.room_group_name, channel_name)
+            # Close the socket if it is still open, so the client reconnects
+            await self.channel_layer.send(channel_name, {'type': 'presence_expired'})
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'user_left',
+                    'user_id': user_info['user_id'],
+                    'username': user_info['username']
+                }
+            )
     
+    def get_user_info(self):
+        """Public details of the connected user shared with the room"""
+        return {
+            'user_id': self.user.id,
+            'username': self.user.username,
+            'email': self.user.email
+        }
+    
+    @message_handler('join-call', Field('timestamp', TIMESTAMP, required=False))
     async def handle_join_call(self, content):
         """Handle user joining call"""
         await self.channel_layer.group_send(
@@ -192,6 +483,7 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             }
         )
     
+    @message_handler('leave-call', Field('timestamp', TIMESTAMP, required=False))
     async def handle_leave_call(self, content):
         """Handle user leaving call"""
         await self.channel_layer.group_send(
@@ -204,22 +496,102 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             }
         )
     
-    @database_sync_to_async
-    def check_meeting_access(self):
-        """Check if user has access to the meeting"""
-        from meetings.models import Meeting, MeetingParticipant
+    @message_handler(
+        'mute',
+        Field('audio', bool, required=False),
+        Field('video', bool, required=False),
+        rate_limited=True,
+        one_of=('audio', 'video')
+    )
+    async def handle_mute(self, content):
+        """Broadcast a change of the user's microphone/camera state"""
+        state = {key: content[key] for key in ('audio', 'video') if content.get(key) is not None}
+        await self.broadcast_control('mute', state)
+    
+    @message_handler('screen-share', Field('active', bool), rate_limited=True)
+    async def handle_screen_share(self, content):
+        """Broadcast that the user started or stopped sharing their screen"""
+        await self.broadcast_control('screen-share', {'active': content['active']})
+    
+    @message_handler('raise-hand', Field('raised', bool), rate_limited=True)
+    async def handle_raise_hand(self, content):
+        """Broadcast that the user raised or lowered their hand"""
+        await self.broadcast_control('raise-hand', {'raised': content['raised']})
+    
+    @message_handler('reaction', Field('emoji', str, max_length=16), rate_limited=True)
+    async def handle_reaction(self, content):
+        """Broadcast an emoji reaction"""
+        await self.broadcast_control('reaction', {'emoji': content['emoji']})
+    
+    async def broadcast_control(self, frame_type, state):
+        """Send a participant control frame to everyone in the room"""
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'control_message',
+                'frame': {'type': frame_type, 'user_id': self.user.id, **state}
+            }
+        )
+    
+    @message_handler(
+        'chat',
+        Field('message', str, max_length=5000),
+        Field('client_id', str, required=False, max_length=64),
+        rate_limited=True
+    )
+    async def handle_chat(self, content):
+        """Broadcast a chat message and queue it for persistence"""
+        message = content['message']
+        if not message.strip():
+            await self.send_json({
+                'type': 'error',
+                'message': 'message is required'
+            })
+            return
         
-        try:
-            meeting = Meeting.objects.get(id=self.meeting_id)
-            # Check if user is host or participant
-            if meeting.host == self.user:
-                return True
-            return MeetingParticipant.objects.filter(
-                meeting=meeting,
-                user=self.user
-            ).exists()
-        except Meeting.DoesNotExist:
-            return False
+        chat_message = ChatMessage(
+            meeting_id=self.meeting_id, sender_id=self.user.id, message=message, created_at=timezone.now()
+        )
+        frame = chat_frame(self.user, chat_message)
+        if content.get('client_id'):
+            # Lets the sender match the echo to its optimistic local copy
+            frame['client_id'] = content['client_id']
+        await self.channel_layer.group_send(
+            self.room_group_name,
+            {
+                'type': 'chat_message',
+                'frame': frame
+            }
+        )
+        get_chat_log().add(chat_message)
+    
+    @message_handler('read', Field('cursor', str, required=False, max_length=200))
+    async def handle_read(self, content):
+        """Move the read cursor to a message cursor, or to the latest message"""
+        position = None
+        if content.get('cursor'):
+            try:
+                position = decode_cursor(content['cursor'])
+            except ValueError as e:
+                await self.send_json({
+                    'type': 'error',
+                    'message': str(e)
+                })
+                return
+        
+        count = await database_sync_to_async(mark_read)(self.user.id, self.meeting_id, position)
+        await self.send_unread_count(count)
+    
+    async def send_unread_count(self, count):
+        await self.send_json({
+            'type': 'unread',
+            'meeting_id': int(self.meeting_id),
+            'unread_count': count
+        })
+    
+    async def check_meeting_access(self):
+        """Check if user has access to the meeting (cached per meeting and user)"""
+        return await ahas_meeting_access(self.meeting_id, self.user)
     
     async def user_joined(self, event):
         """Send user joined notification"""
@@ -230,6 +602,11 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             'email': event.get('email', '')
         })
     
+    async def presence_expired(self, event):
+        """Another consumer swept this socket out of the roster after it stopped heartbeating"""
+        logger.info(f"Closing stale socket of user {self.user.id} in meeting {self.meeting_id}")
+        await self.close(code=4008)
+    
     async def user_left(self, event):
         """Send user left notification"""
         await self.send_json({
@@ -274,6 +651,26 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             'sender_id': event['sender_id']
         })
     
+    async def ice_candidates(self, event):
+        """Send a batch of ICE candidates to other peers"""
+        if event.get('target_id') and event['target_id'] != self.user.id:
+            return
+        
+        if self.ice_batch:
+            await self.send_json({
+                'type': 'ice-candidates',
+                'candidates': event['candidates'],
+                'sender_id': event['sender_id']
+            })
+            return
+        
+        for candidate in event['candidates']:
+            await self.send_json({
+                'type': 'ice-candidate',
+                'candidate': candidate,
+                'sender_id': event['sender_id']
+            })
+    
     async def call_joined(self, event):
         """Send call joined notification"""
         await self.send_json({
@@ -291,4 +688,20 @@ class MeetingConsumer(AsyncJsonWebsocketConsumer):
             'username': event['username'],
             'timestamp': event.get('timestamp')
         })
-
+    
+    async def control_message(self, event):
+        """Send a participant control frame (mute, screen-share, raise-hand, reaction)"""
+        await self.send_json(event['frame'])
+    
+    async def chat_message(self, event):
+        """Send a chat message to WebSocket"""
+        await self.send_json(event['frame'])
+    
+    async def chat_messages(self, event):
+        """Send chat messages broadcast together (see broadcast_chat) one frame each"""
+        for frame in event['frames']:
+            await self.send_json(frame)
+    
+    async def unread_update(self, event):
+        """Send an unread count changed elsewhere (e.g. over HTTP)"""
+        await self.send_unread_count(event['unread_count'])
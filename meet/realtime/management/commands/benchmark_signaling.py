@@ -0,0 +1,96 @@
+"""
+Benchmark targeted WebRTC signaling delivery against room size.
+
+Compares the old approach (group_send to the whole meeting group, receivers
+discard events that are not addressed to them) with unicast delivery through
+the per-meeting channel registry, and reports channel-layer deliveries and
+time per message for each room size.
+"""
+
+from django.core.management.base import BaseCommand
+from channels.layers import InMemoryChannelLayer
+import asyncio
+import time
+
+from realtime.registry import LocalChannelRegistry
+
+
+class Command(BaseCommand):
+    help = 'Benchmark group fan-out vs. unicast delivery of targeted signaling messages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            help='Comma-separated list of room sizes',
+            default='2,5,10,25,50,100'
+        )
+        parser.add_argument(
+            '--messages',
+            type=int,
+            help='Targeted messages sent per room size',
+            default=1000
+        )
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        messages = options['messages']
+
+        self.stdout.write(self.style.SUCCESS('=' * 72))
+        self.stdout.write(self.style.SUCCESS(f'Targeted signaling benchmark ({messages} messages per room)'))
+        self.stdout.write(self.style.SUCCESS('=' * 72))
+        self.stdout.write(
+            f"{'room size':>10} | {'fan-out deliv/msg':>18} {'us/msg':>9} | "
+            f"{'unicast deliv/msg':>18} {'us/msg':>9}"
+        )
+        self.stdout.write('-' * 72)
+
+        for size in sizes:
+            fanout = asyncio.run(self.run_room(size, messages, unicast=False))
+            unicast = asyncio.run(self.run_room(size, messages, unicast=True))
+            self.stdout.write(
+                f'{size:>10} | {fanout[0]:>18.1f} {fanout[1]:>9.1f} | '
+                f'{unicast[0]:>18.1f} {unicast[1]:>9.1f}'
+            )
+
+    async def run_room(self, size, messages, unicast):
+        """
+        Send targeted messages around a room of the given size.
+        Returns (deliveries per message, microseconds per message).
+        """
+        layer = InMemoryChannelLayer(capacity=messages * size + 1)
+        registry = LocalChannelRegistry()
+        group = 'meeting_bench'
+        meeting_id = 'bench'
+
+        channels = []
+        for user_id in range(1, size + 1):
+            channel = await layer.new_channel()
+            channels.append(channel)
+            await layer.group_add(group, channel)
+            await registry.register(meeting_id, user_id, channel)
+
+        deliveries = 0
+        elapsed = 0.0
+        for i in range(messages):
+            sender_id = i % size + 1
+            target_id = (i + 1) % size + 1
+            event = {
+                'type': 'ice_candidate',
+                'candidate': {'candidate': 'candidate:0 1 UDP 2122252543 10.0.0.1 50000 typ host'},
+                'sender_id': sender_id,
+                'target_id': target_id,
+            }
+
+            start = time.perf_counter()
+            if unicast:
+                target_channel = await registry.lookup(meeting_id, target_id)
+                await layer.send(target_channel, event)
+            else:
+                await layer.group_send(group, event)
+            elapsed += time.perf_counter() - start
+
+            deliveries += sum(queue.qsize() for queue in layer.channels.values())
+            layer.channels = {}
+
+        return deliveries / messages, elapsed / messages * 1e6
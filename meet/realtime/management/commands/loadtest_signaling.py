@@ -0,0 +1,233 @@
+"""
+Load-test the meeting WebSocket signaling server in-process.
+
+Runs the real websocket routing (MeetingConsumer, access checks, channel
+layer from settings) through channels.testing.WebsocketCommunicator against
+a throwaway test database. Each room of peers performs a full-mesh WebRTC
+setup: every pair exchanges an offer, an answer and a number of trickled ICE
+candidates in each direction.
+
+Reports throughput, delivery latency percentiles, memory held per idle
+connection and the outbound queue counters, e.g.
+
+    python manage.py loadtest_signaling --rooms 20 --peers 8 --candidates 10
+"""
+
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+import asyncio
+import time
+import tracemalloc
+
+from meetings.models import Meeting, MeetingParticipant
+from realtime import routing
+from realtime.codecs import CODECS, DEFAULT_CODEC
+from realtime.outbound import totals as outbound_totals
+
+User = get_user_model()
+
+
+class Peer:
+    """One simulated browser in a room"""
+
+    def __init__(self, application, meeting, user, codec, ice_batch):
+        path = f'/ws/meeting/{meeting.id}/' + ('?ice_batch=1' if ice_batch else '')
+        subprotocols = [codec.subprotocol] if codec is not DEFAULT_CODEC else None
+        self.communicator = WebsocketCommunicator(application, path, subprotocols=subprotocols)
+        self.communicator.scope['user'] = user
+        self.user = user
+        self.codec = codec
+        self.received = 0
+        self.latencies = []
+        self.errors = []
+
+    async def send(self, content):
+        frame = self.codec.encode(content)
+        if self.codec.binary:
+            await self.communicator.send_to(bytes_data=frame)
+        else:
+            await self.communicator.send_to(text_data=frame)
+
+    async def receive(self):
+        message = await self.communicator.receive_output(timeout=None)
+        return self.codec.decode(message.get('text') or message.get('bytes'))
+
+
+class Command(BaseCommand):
+    help = 'Load-test MeetingConsumer signaling with simulated rooms of WebRTC peers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rooms', type=int, default=10, help='Number of concurrent meetings')
+        parser.add_argument('--peers', type=int, default=5, help='Peers per meeting')
+        parser.add_argument('--candidates', type=int, default=8, help='ICE candidates each peer trickles per connection')
+        parser.add_argument(
+            '--format',
+            choices=sorted(CODECS),
+            default=DEFAULT_CODEC.subprotocol,
+            help='Wire format (WebSocket subprotocol) used by the simulated clients'
+        )
+        parser.add_argument('--ice-batch', action='store_true', help='Clients accept batched ice-candidates frames')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds to wait for all deliveries')
+        parser.add_argument('--no-rate-limit', action='store_true', help='Disable signaling rate limits for the run')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            meetings = self.create_meetings(options['rooms'], options['peers'])
+            if options['no_rate_limit']:
+                with override_settings(SIGNALING_CONNECTION_RATE=0, SIGNALING_ROOM_RATE=0):
+                    asyncio.run(self.run(meetings, options))
+            else:
+                asyncio.run(self.run(meetings, options))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+    def create_meetings(self, rooms, peers):
+        """Create rooms x peers users and one meeting per room; returns [(meeting, [users])]"""
+        users = []
+        for i in range(rooms * peers):
+            user = User(email=f'loadtest{i}@unio.app', username=f'loadtest{i}')
+            user.set_unusable_password()
+            users.append(user)
+        users = User.objects.bulk_create(users)
+
+        meetings = Meeting.objects.bulk_create([
+            Meeting(title=f'Load test {r}', host=users[r * peers], scheduled_at=timezone.now())
+            for r in range(rooms)
+        ])
+        MeetingParticipant.objects.bulk_create([
+            MeetingParticipant(meeting=meeting, user=user)
+            for r, meeting in enumerate(meetings)
+            for user in users[r * peers + 1:(r + 1) * peers]
+        ])
+        return [(meeting, users[r * peers:(r + 1) * peers]) for r, meeting in enumerate(meetings)]
+
+    async def run(self, meetings, options):
+        application = URLRouter(routing.websocket_urlpatterns)
+        codec = CODECS[options['format']]
+        peers_per_room = options['peers']
+        candidates = options['candidates']
+        rooms = [
+            [Peer(application, meeting, user, codec, options['ice_batch']) for user in users]
+            for meeting, users in meetings
+        ]
+        all_peers = [peer for room in rooms for peer in room]
+
+        # Connect everyone, measuring memory held by idle connections
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for peer in all_peers:
+            connected, _ = await peer.communicator.connect(timeout=10)
+            if not connected:
+                raise RuntimeError(f'User {peer.user.id} could not connect')
+        await self.drain(all_peers)
+        connect_time = time.perf_counter() - start
+        per_connection = (tracemalloc.get_traced_memory()[0] - baseline) / len(all_peers)
+        tracemalloc.stop()
+
+        # Each pair exchanges offer + answer + candidates both ways
+        pairs = peers_per_room * (peers_per_room - 1) // 2
+        expected_per_room = pairs * (2 + 2 * candidates)
+        expected = expected_per_room * len(rooms)
+        outbound_before = dict(outbound_totals)
+
+        start = time.perf_counter()
+        readers = [asyncio.create_task(self.read(peer, candidates)) for peer in all_peers]
+        for room in rooms:
+            for i, peer in enumerate(room):
+                for other in room[i + 1:]:
+                    await peer.send({'type': 'offer', 'offer': {'type': 'offer', 'sdp': 'v=0', 'sent_at': time.perf_counter()}, 'target_id': other.user.id})
+                    await self.trickle(peer, other.user.id, candidates)
+
+        deadline = time.perf_counter() + options['timeout']
+        while sum(peer.received for peer in all_peers) < expected and time.perf_counter() < deadline:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        for reader in readers:
+            reader.cancel()
+
+        for peer in all_peers:
+            await peer.communicator.disconnect()
+
+        self.report(rooms, all_peers, expected, elapsed, connect_time, per_connection, outbound_before, options)
+
+    async def trickle(self, peer, target_id, candidates):
+        """Send a peer's ICE candidates to one target"""
+        for n in range(candidates):
+            await peer.send({
+                'type': 'ice-candidate',
+                'candidate': {
+                    'candidate': f'candidate:{n} 1 UDP 2122252543 10.0.{peer.user.id % 255}.{n} {50000 + n} typ host',
+                    'sdpMid': '0',
+                    'sdpMLineIndex': 0,
+                    'sent_at': time.perf_counter()
+                },
+                'target_id': target_id
+            })
+
+    async def read(self, peer, candidates):
+        """Answer offers and record delivery latency of every signaling payload"""
+        while True:
+            content = await peer.receive()
+            now = time.perf_counter()
+            frame_type = content.get('type')
+            if frame_type == 'offer':
+                peer.received += 1
+                peer.latencies.append(now - content['offer']['sent_at'])
+                await peer.send({'type': 'answer', 'answer': {'type': 'answer', 'sdp': 'v=0', 'sent_at': time.perf_counter()}, 'target_id': content['sender_id']})
+                await self.trickle(peer, content['sender_id'], candidates)
+            elif frame_type == 'answer':
+                peer.received += 1
+                peer.latencies.append(now - content['answer']['sent_at'])
+            elif frame_type == 'ice-candidate':
+                peer.received += 1
+                peer.latencies.append(now - content['candidate']['sent_at'])
+            elif frame_type == 'ice-candidates':
+                peer.received += len(content['candidates'])
+                peer.latencies.extend(now - candidate['sent_at'] for candidate in content['candidates'])
+            elif frame_type == 'error':
+                peer.errors.append(content.get('code') or content.get('message'))
+
+    async def drain(self, peers):
+        """Discard presence frames produced while connecting"""
+        for peer in peers:
+            while not await peer.communicator.receive_nothing(timeout=0.01):
+                await peer.communicator.receive_output()
+
+    def report(self, rooms, peers, expected, elapsed, connect_time, per_connection, outbound_before, options):
+        latencies = sorted(latency for peer in peers for latency in peer.latencies)
+        delivered = sum(peer.received for peer in peers)
+        errors = [error for peer in peers for error in peer.errors]
+        outbound = {key: outbound_totals[key] - outbound_before.get(key, 0) for key in outbound_totals}
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(self.style.SUCCESS('Signaling load test'))
+        self.stdout.write(self.style.SUCCESS('=' * 60))
+        self.stdout.write(f"  Rooms x peers:        {len(rooms)} x {options['peers']} ({len(peers)} connections)")
+        self.stdout.write(f"  Wire format:          {options['format']}{' + ice batches' if options['ice_batch'] else ''}")
+        self.stdout.write(f'  Connect time:         {connect_time:.2f}s')
+        self.stdout.write(f'  Memory / connection:  {per_connection / 1024:.1f} KiB')
+        self.stdout.write(f'  Delivered:            {delivered}/{expected} payloads in {elapsed:.2f}s')
+        self.stdout.write(f'  Throughput:           {delivered / elapsed if elapsed else 0:.0f} payloads/s')
+        self.stdout.write(f'  Latency p50 / p99:    {percentile(0.5):.2f}ms / {percentile(0.99):.2f}ms')
+        self.stdout.write(f'  Outbound queue:       {outbound}')
+        if errors:
+            self.stdout.write(self.style.WARNING(f'  Error frames:         {len(errors)} ({", ".join(sorted(set(errors)))})'))
+        if delivered < expected:
+            self.stdout.write(self.style.ERROR(f'  ✗ {expected - delivered} payloads were not delivered'))
+        else:
+            self.stdout.write(self.style.SUCCESS('  ✓ All payloads delivered'))
@@ -0,0 +1,83 @@
+"""
+Registry of client message types accepted by MeetingConsumer.
+
+Each handler is registered with the @message_handler decorator together with
+its payload fields. A validator is built once per message type at import
+time, so receive_json only does a dict lookup and a few isinstance checks
+before rejecting a bad payload, without touching the channel layer. Adding a
+message type means adding one decorated handler, e.g.
+
+    @message_handler('raise-hand', Field('raised', bool), rate_limited=True)
+    async def handle_raise_hand(self, content):
+        ...
+"""
+
+# Accepted JSON types for common payload shapes
+SDP = (dict, str)
+TIMESTAMP = (int, float, str)
+
+MESSAGE_HANDLERS = {}
+
+
+class Field:
+    """A payload field: its accepted types, whether it is required and the error if not"""
+
+    __slots__ = ('name', 'types', 'required', 'error', 'max_length')
+
+    def __init__(self, name, types, required=True, error=None, max_length=None):
+        self.name = name
+        self.types = types if isinstance(types, tuple) else (types,)
+        self.required = required
+        self.error = error or f'{name} is required'
+        self.max_length = max_length
+
+
+class MessageSpec:
+    """A registered message type: its handler, validator and rate limiting flag"""
+
+    __slots__ = ('message_type', 'handler', 'validate', 'rate_limited')
+
+    def __init__(self, message_type, handler, fields, rate_limited, one_of=()):
+        self.message_type = message_type
+        self.handler = handler
+        self.validate = compile_validator(fields, one_of)
+        self.rate_limited = rate_limited
+
+
+def compile_validator(fields, one_of=()):
+    """
+    Build a function returning an error message for an invalid payload,
+    or None if the payload is valid. `one_of` names optional fields of
+    which at least one must be given.
+    """
+    checks = tuple(
+        (field.name, field.types, field.required, field.error, field.max_length,
+         bool in field.types, int in field.types)
+        for field in fields
+    )
+
+    def validate(content):
+        for name, types, required, error, max_length, allows_bool, allows_int in checks:
+            value = content.get(name)
+            if value is None or value == '' or value == {}:
+                if required:
+                    return error
+                continue
+            # bool is an int subclass; only accept it where bool is declared
+            if not isinstance(value, types) or (isinstance(value, bool) and allows_int and not allows_bool):
+                return f'{name} has an invalid type'
+            if max_length is not None and len(value) > max_length:
+                return f'{name} must be at most {max_length} characters'
+        if one_of and all(content.get(name) is None for name in one_of):
+            return f'One of {", ".join(one_of)} is required'
+        return None
+
+    return validate
+
+
+def message_handler(message_type, *fields, rate_limited=False, one_of=()):
+    """Register a consumer method as the handler for a client message type"""
+    def decorator(handler):
+        MESSAGE_HANDLERS[message_type] = MessageSpec(message_type, handler, fields, rate_limited, one_of)
+        return handler
+    return decorator
@@ -0,0 +1,184 @@
+"""
+Bounded, prioritised outbound frame queue for a WebSocket connection.
+
+Event handlers put frames here instead of writing to the socket directly,
+and a single writer task drains the queue, so a stalled client never blocks
+the consumer from reading its channel. The queue holds at most `maxsize`
+live frames:
+
+- Signaling and control frames are sent before presence frames, which are
+  sent before everything else.
+- A newer frame supersedes a queued one carrying the same state: a peer's
+  offer or answer, the presence snapshot, the unread count, a join/leave for
+  the same user, or a user's mute/screen-share/raise-hand state. A user's
+  queued mute state is merged into the newer one, so an audio change is not
+  lost to a later video change.
+- Queued ICE candidates from the same sender are merged into a single
+  ice-candidates frame when the client accepts batches. When a sender's
+  offer or answer is superseded, its queued candidates belonged to the old
+  session description and are dropped with it.
+- When full, the oldest frame of the least important non-empty priority
+  (no more important than the new frame) is dropped; otherwise the new frame
+  is dropped.
+
+Per-connection counts live on `OutboundQueue.stats`; `totals` aggregates them
+for the whole process.
+"""
+
+from collections import Counter, deque
+import asyncio
+
+
+PRIORITY_SIGNALING = 0
+PRIORITY_PRESENCE = 1
+PRIORITY_OTHER = 2
+
+FRAME_PRIORITIES = {
+    'error': PRIORITY_SIGNALING,
+    'heartbeat-ack': PRIORITY_SIGNALING,
+    'offer': PRIORITY_SIGNALING,
+    'answer': PRIORITY_SIGNALING,
+    'ice-candidate': PRIORITY_SIGNALING,
+    'ice-candidates': PRIORITY_SIGNALING,
+    'presence': PRIORITY_PRESENCE,
+    'user_joined': PRIORITY_PRESENCE,
+    'user_left': PRIORITY_PRESENCE,
+    'call-joined': PRIORITY_PRESENCE,
+    'call-left': PRIORITY_PRESENCE,
+    'mute': PRIORITY_PRESENCE,
+    'screen-share': PRIORITY_PRESENCE,
+    'raise-hand': PRIORITY_PRESENCE,
+}
+
+totals = Counter()
+
+
+class _Entry:
+    __slots__ = ('content', 'key')
+
+    def __init__(self, content, key):
+        self.content = content
+        self.key = key
+
+
+class OutboundQueue:
+    """Outbound frames of one WebSocket connection, see the module docstring"""
+
+    def __init__(self, maxsize, merge_ice=False):
+        self.maxsize = maxsize
+        self.merge_ice = merge_ice
+        self.stats = Counter()
+        self._queues = [deque() for _ in range(PRIORITY_OTHER + 1)]
+        self._keyed = {}
+        self._size = 0
+        self._ready = asyncio.Event()
+
+    def __len__(self):
+        return self._size
+
+    def _key(self, content):
+        """Return the key a frame can be superseded or merged under, if any"""
+        frame_type = content.get('type')
+        if frame_type in ('offer', 'answer'):
+            return (frame_type, content.get('sender_id'))
+        if frame_type in ('ice-candidate', 'ice-candidates') and self.merge_ice:
+            return ('ice', content.get('sender_id'))
+        if frame_type in ('presence', 'unread'):
+            return (frame_type,)
+        if frame_type in ('user_joined', 'user_left'):
+            return ('user', content.get('user_id'))
+        if frame_type in ('mute', 'screen-share', 'raise-hand'):
+            return (frame_type, content.get('user_id'))
+        return None
+
+    def _count(self, name):
+        self.stats[name] += 1
+        totals[name] += 1
+
+    def put(self, content):
+        """Queue a frame without blocking, applying the merge and drop policies"""
+        priority = FRAME_PRIORITIES.get(content.get('type'), PRIORITY_OTHER)
+        key = self._key(content)
+
+        existing = self._keyed.get(key) if key else None
+        if existing is not None:
+            if key[0] == 'ice':
+                existing.content = self._merge_candidates(existing.content, content)
+                self._count('merged')
+                return
+            if key[0] == 'mute':
+                content = dict(existing.content, **content)
+            existing.content = None
+            self._size -= 1
+            self._count('superseded')
+            if key[0] in ('offer', 'answer'):
+                self._drop_candidates(key[1])
+
+        if self._size >= self.maxsize and not self._evict(priority):
+            self._count('dropped')
+            return
+
+        # Candidates sent after a new offer/answer must not merge into a
+        # batch queued ahead of it
+        if key and key[0] in ('offer', 'answer'):
+            self._keyed.pop(('ice', key[1]), None)
+
+        entry = _Entry(content, key)
+        self._queues[priority].append(entry)
+        if key:
+            self._keyed[key] = entry
+        self._size += 1
+        self._ready.set()
+
+    async def get(self):
+        """Wait for and return the most important queued frame"""
+        while True:
+            for queue in self._queues:
+                entry = self._pop(queue)
+                if entry is not None:
+                    self._count('sent')
+                    return entry.content
+            self._ready.clear()
+            await self._ready.wait()
+
+    def _pop(self, queue):
+        """Pop the oldest live entry of a priority queue, skipping superseded ones"""
+        while queue:
+            entry = queue.popleft()
+            if entry.content is None:
+                continue
+            if entry.key and self._keyed.get(entry.key) is entry:
+                del self._keyed[entry.key]
+            self._size -= 1
+            return entry
+        return None
+
+    def _drop_candidates(self, sender_id):
+        """Drop every queued ICE candidate frame from a sender"""
+        self._keyed.pop(('ice', sender_id), None)
+        for entry in self._queues[PRIORITY_SIGNALING]:
+            content = entry.content
+            if content is None or content.get('sender_id') != sender_id:
+                continue
+            if content.get('type') in ('ice-candidate', 'ice-candidates'):
+                entry.content = None
+                self._size -= 1
+                self._count('superseded')
+
+    def _evict(self, priority):
+        """Drop the oldest frame no more important than `priority` to make room"""
+        for queue in reversed(self._queues[priority:]):
+            if self._pop(queue) is not None:
+                self._count('dropped')
+                return True
+        return False
+
+    @staticmethod
+    def _merge_candidates(queued, content):
+        candidates = queued.get('candidates') or [queued['candidate']]
+        candidates = candidates + (content.get('candidates') or [content['candidate']])
+        return {
+            'type': 'ice-candidates',
+            'candidates': candidates,
+            'sender_id': queued.get('sender_id')
+        }
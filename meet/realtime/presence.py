@@ -0,0 +1,176 @@
+"""
+Per-meeting presence roster.
+
+Each connected user has an entry with their public details and the channel
+they are connected on. Clients that send heartbeats also get a last-seen
+timestamp refreshed by their messages. New connections receive the roster
+as a snapshot, later changes travel as user_joined/user_left deltas.
+Entries whose heartbeat is older than PRESENCE_TIMEOUT belong to sockets
+that died without a disconnect and are swept out by the remaining
+consumers. Clients that never heartbeat are only removed on disconnect.
+
+Like the channel registry, the roster follows the configured channel layer:
+in-process for InMemoryChannelLayer, Redis for RedisChannelLayer.
+"""
+
+from channels_redis.core import RedisChannelLayer
+import json
+import time
+
+
+class LocalPresenceStore:
+    """In-process presence roster, matching the scope of InMemoryChannelLayer"""
+
+    def __init__(self):
+        self._meetings = {}
+
+    async def join(self, meeting_id, user_info, channel_name, heartbeat=False):
+        """
+        Add or refresh a user's entry, to be swept when it goes stale only
+        if the client sends heartbeats. Returns True if the user was not
+        present before.
+        """
+        members = self._meetings.setdefault(str(meeting_id), {})
+        is_new = user_info['user_id'] not in members
+        members[user_info['user_id']] = {
+            'info': user_info,
+            'channel_name': channel_name,
+            'last_seen': time.time() if heartbeat else None,
+        }
+        return is_new
+
+    async def leave(self, meeting_id, user_id, channel_name):
+        """
+        Remove a user's entry, unless a newer connection replaced it.
+        Returns True if the entry was removed.
+        """
+        members = self._meetings.get(str(meeting_id))
+        if not members or user_id not in members or members[user_id]['channel_name'] != channel_name:
+            return False
+        del members[user_id]
+        if not members:
+            del self._meetings[str(meeting_id)]
+        return True
+
+    async def snapshot(self, meeting_id):
+        """Return the list of users currently present in a meeting"""
+        return [entry['info'] for entry in self._meetings.get(str(meeting_id), {}).values()]
+
+    async def expire(self, meeting_id, timeout):
+        """
+        Remove entries not seen for `timeout` seconds.
+        Returns a list of (user_info, channel_name) for the removed entries.
+        """
+        members = self._meetings.get(str(meeting_id), {})
+        cutoff = time.time() - timeout
+        expired = []
+        for user_id, entry in list(members.items()):
+            if entry['last_seen'] is not None and entry['last_seen'] < cutoff:
+                del members[user_id]
+                expired.append((entry['info'], entry['channel_name']))
+        if not members:
+            self._meetings.pop(str(meeting_id), None)
+        return expired
+
+
+class RedisPresenceStore:
+    """
+    Presence roster stored on the RedisChannelLayer shard of the meeting
+    group: a hash of user entries and a sorted set of last-seen timestamps
+    of the users that send heartbeats.
+    """
+
+    # Remove the entry only if it still belongs to the disconnecting channel
+    LEAVE_SCRIPT = """
+        local entry = redis.call('HGET', KEYS[1], ARGV[1])
+        if entry and cjson.decode(entry)['channel_name'] == ARGV[2] then
+            redis.call('HDEL', KEYS[1], ARGV[1])
+            redis.call('ZREM', KEYS[2], ARGV[1])
+            return 1
+        end
+        return 0
+    """
+
+    # Atomically pop every entry last seen before the cutoff, so only one
+    # consumer announces each expired user
+    EXPIRE_SCRIPT = """
+        local expired = {}
+        for _, user_id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])) do
+            local entry = redis.call('HGET', KEYS[1], user_id)
+            redis.call('HDEL', KEYS[1], user_id)
+            redis.call('ZREM', KEYS[2], user_id)
+            if entry then
+                table.insert(expired, entry)
+            end
+        end
+        return expired
+    """
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+
+    def _keys(self, meeting_id):
+        key = f'{self.channel_layer.prefix}:presence:meeting_{meeting_id}'
+        return key, f'{key}:seen'
+
+    def _connection(self, meeting_id):
+        return self.channel_layer.connection(
+            self.channel_layer.consistent_hash(f'meeting_{meeting_id}')
+        )
+
+    async def join(self, meeting_id, user_info, channel_name, heartbeat=False):
+        """
+        Add or refresh a user's entry, to be swept when it goes stale only
+        if the client sends heartbeats. Returns True if the user was not
+        present before.
+        """
+        entries_key, seen_key = self._keys(meeting_id)
+        user_id = str(user_info['user_id'])
+        entry = json.dumps({'info': user_info, 'channel_name': channel_name})
+        async with self._connection(meeting_id).pipeline(transaction=True) as pipe:
+            pipe.hset(entries_key, user_id, entry)
+            if heartbeat:
+                pipe.zadd(seen_key, {user_id: time.time()})
+            else:
+                pipe.zrem(seen_key, user_id)
+            pipe.expire(entries_key, self.channel_layer.group_expiry)
+            pipe.expire(seen_key, self.channel_layer.group_expiry)
+            added, *_ = await pipe.execute()
+        return bool(added)
+
+    async def leave(self, meeting_id, user_id, channel_name):
+        """
+        Remove a user's entry, unless a newer connection replaced it.
+        Returns True if the entry was removed.
+        """
+        removed = await self._connection(meeting_id).eval(
+            self.LEAVE_SCRIPT, 2, *self._keys(meeting_id), str(user_id), channel_name
+        )
+        return bool(removed)
+
+    async def snapshot(self, meeting_id):
+        """Return the list of users currently present in a meeting"""
+        entries_key, _ = self._keys(meeting_id)
+        entries = await self._connection(meeting_id).hvals(entries_key)
+        return [json.loads(entry)['info'] for entry in entries]
+
+    async def expire(self, meeting_id, timeout):
+        """
+        Remove entries not seen for `timeout` seconds.
+        Returns a list of (user_info, channel_name) for the removed entries.
+        """
+        expired = await self._connection(meeting_id).eval(
+            self.EXPIRE_SCRIPT, 2, *self._keys(meeting_id), time.time() - timeout
+        )
+        entries = [json.loads(entry) for entry in expired]
+        return [(entry['info'], entry['channel_name']) for entry in entries]
+
+
+_local_presence = LocalPresenceStore()
+
+
+def get_presence_store(channel_layer):
+    """Return the presence store that matches the given channel layer"""
+    if isinstance(channel_layer, RedisChannelLayer):
+        return RedisPresenceStore(channel_layer)
+    return _local_presence
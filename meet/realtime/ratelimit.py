@@ -0,0 +1,132 @@
+"""
+Token-bucket rate limiting for signaling messages.
+
+Every rate-limited message (signaling and participant controls, see
+realtime.messages) first spends a token from its connection's bucket and
+then one from the meeting's bucket, so a single client cannot multiply load
+on a room and a whole room has a predictable ceiling. The room
+buckets are kept in-process by default; with SIGNALING_RATE_LIMIT_BACKEND set
+to 'redis' (and a Redis channel layer) they are shared between workers and
+stored on the meeting's shard.
+"""
+
+from django.conf import settings
+from channels_redis.core import RedisChannelLayer
+import time
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def consume(self, cost=1):
+        """Take `cost` tokens if available. Returns True if allowed."""
+        if self.rate <= 0:
+            return True
+        self.refill()
+        if self.tokens < cost:
+            return False
+        self.tokens -= cost
+        return True
+
+    def retry_after(self, cost=1):
+        """Seconds until `cost` tokens will be available"""
+        if self.rate <= 0:
+            return 0
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+
+class LocalRoomLimiter:
+    """Per-meeting token buckets held in this process"""
+
+    # Idle buckets are pruned once this many meetings are tracked
+    MAX_IDLE_BUCKETS = 1024
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+
+    async def consume(self, meeting_id, cost=1):
+        """Take `cost` tokens from the meeting's bucket. Returns True if allowed."""
+        if self.rate <= 0:
+            return True
+        bucket = self._buckets.get(str(meeting_id))
+        if bucket is None:
+            if len(self._buckets) >= self.MAX_IDLE_BUCKETS:
+                self._prune()
+            bucket = self._buckets[str(meeting_id)] = TokenBucket(self.rate, self.burst)
+        return bucket.consume(cost)
+
+    def _prune(self):
+        for meeting_id, bucket in list(self._buckets.items()):
+            bucket.refill()
+            if bucket.tokens >= bucket.burst:
+                del self._buckets[meeting_id]
+
+
+class RedisRoomLimiter:
+    """Per-meeting token buckets shared between workers through Redis"""
+
+    CONSUME_SCRIPT = """
+        local rate, burst, cost = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated_at')
+        local tokens, updated_at = tonumber(state[1]), tonumber(state[2])
+        if tokens == nil then
+            tokens, updated_at = burst, now
+        end
+        tokens = math.min(burst, tokens + (now - updated_at) * rate)
+        local allowed = 0
+        if tokens >= cost then
+            tokens = tokens - cost
+            allowed = 1
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+        redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+        return allowed
+    """
+
+    def __init__(self, channel_layer, rate, burst):
+        self.channel_layer = channel_layer
+        self.rate = rate
+        self.burst = burst
+
+    async def consume(self, meeting_id, cost=1):
+        """Take `cost` tokens from the meeting's bucket. Returns True if allowed."""
+        if self.rate <= 0:
+            return True
+        connection = self.channel_layer.connection(
+            self.channel_layer.consistent_hash(f'meeting_{meeting_id}')
+        )
+        allowed = await connection.eval(
+            self.CONSUME_SCRIPT, 1, f'{self.channel_layer.prefix}:ratelimit:meeting_{meeting_id}',
+            self.rate, self.burst, cost
+        )
+        return bool(allowed)
+
+
+_local_room_limiter = None
+
+
+def get_room_limiter(channel_layer):
+    """Return the room limiter selected by SIGNALING_RATE_LIMIT_BACKEND"""
+    global _local_room_limiter
+
+    rate, burst = settings.SIGNALING_ROOM_RATE, settings.SIGNALING_ROOM_BURST
+    if settings.SIGNALING_RATE_LIMIT_BACKEND == 'redis' and isinstance(channel_layer, RedisChannelLayer):
+        return RedisRoomLimiter(channel_layer, rate, burst)
+    if _local_room_limiter is None:
+        _local_room_limiter = LocalRoomLimiter(rate, burst)
+    return _local_room_limiter
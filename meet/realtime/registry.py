@@ -0,0 +1,106 @@
+"""
+Per-meeting registry of connected users and their channel names.
+
+Targeted signaling messages (offer/answer/ICE with a target_id) are looked up
+here and delivered with a single channel_layer.send() instead of a group_send
+that every peer in the room has to receive and discard.
+
+The registry has to be visible to every worker that can hold a consumer for
+the meeting, so it follows the configured channel layer: an in-process dict
+for InMemoryChannelLayer and a Redis hash, on the same shard as the meeting
+group, for RedisChannelLayer.
+"""
+
+from channels_redis.core import RedisChannelLayer
+
+
+class LocalChannelRegistry:
+    """
+    In-process registry mapping (meeting_id, user_id) to a channel name.
+    Matches the scope of InMemoryChannelLayer: only consumers running in this
+    process are visible.
+    """
+
+    def __init__(self):
+        self._meetings = {}
+
+    async def register(self, meeting_id, user_id, channel_name):
+        """Record the channel a user is connected on for a meeting"""
+        self._meetings.setdefault(str(meeting_id), {})[user_id] = channel_name
+
+    async def unregister(self, meeting_id, user_id, channel_name):
+        """Forget a user's channel, unless a newer connection replaced it"""
+        members = self._meetings.get(str(meeting_id))
+        if not members or members.get(user_id) != channel_name:
+            return
+        del members[user_id]
+        if not members:
+            del self._meetings[str(meeting_id)]
+
+    async def lookup(self, meeting_id, user_id):
+        """Return the channel name for a user in a meeting, or None"""
+        return self._meetings.get(str(meeting_id), {}).get(user_id)
+
+    async def members(self, meeting_id):
+        """Return a {user_id: channel_name} snapshot for a meeting"""
+        return dict(self._meetings.get(str(meeting_id), {}))
+
+
+class RedisChannelRegistry:
+    """
+    Registry stored as one Redis hash per meeting, on the RedisChannelLayer
+    shard that also holds the meeting_<id> group. Reuses the layer's
+    connection pools and expires together with its groups.
+    """
+
+    # Only delete the entry if it still points at the disconnecting channel
+    UNREGISTER_SCRIPT = """
+        if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+            return redis.call('HDEL', KEYS[1], ARGV[1])
+        end
+        return 0
+    """
+
+    def __init__(self, channel_layer):
+        self.channel_layer = channel_layer
+
+    def _key(self, meeting_id):
+        return f'{self.channel_layer.prefix}:registry:meeting_{meeting_id}'
+
+    def _connection(self, meeting_id):
+        return self.channel_layer.connection(
+            self.channel_layer.consistent_hash(f'meeting_{meeting_id}')
+        )
+
+    async def register(self, meeting_id, user_id, channel_name):
+        """Record the channel a user is connected on for a meeting"""
+        key = self._key(meeting_id)
+        connection = self._connection(meeting_id)
+        await connection.hset(key, str(user_id), channel_name)
+        await connection.expire(key, self.channel_layer.group_expiry)
+
+    async def unregister(self, meeting_id, user_id, channel_name):
+        """Forget a user's channel, unless a newer connection replaced it"""
+        await self._connection(meeting_id).eval(
+            self.UNREGISTER_SCRIPT, 1, self._key(meeting_id), str(user_id), channel_name
+        )
+
+    async def lookup(self, meeting_id, user_id):
+        """Return the channel name for a user in a meeting, or None"""
+        channel_name = await self._connection(meeting_id).hget(self._key(meeting_id), str(user_id))
+        return channel_name.decode('utf8') if channel_name is not None else None
+
+    async def members(self, meeting_id):
+        """Return a {user_id: channel_name} snapshot for a meeting"""
+        members = await self._connection(meeting_id).hgetall(self._key(meeting_id))
+        return {int(user_id): channel_name.decode('utf8') for user_id, channel_name in members.items()}
+
+
+_local_registry = LocalChannelRegistry()
+
+
+def get_channel_registry(channel_layer):
+    """Return the registry that matches the given channel layer"""
+    if isinstance(channel_layer, RedisChannelLayer):
+        return RedisChannelRegistry(channel_layer)
+    return _local_registry
@@ -108,7 +108,7 @@ if meeting_id:
     print_section("5. GET ALL MESSAGES")
     response = requests.get(f"{BASE_URL}/api/chat/meetings/{meeting_id}/messages/", headers=headers)
     if response.status_code == 200:
-        messages = response.json()
+        messages = response.json()['results']
         print_test(f"Retrieved {len(messages)} message(s)")
         print("\nMessages:")
         for msg in messages:
@@ -94,6 +94,31 @@ DATABASES = {
 }
 
 
+# Cache
+# Local memory by default; set CACHE_URL (e.g. redis://localhost:6379/1) to share
+# the cache, and its invalidations, between workers. Conditional GETs on the
+# polled lists (meetings.versions) are only answered with a shared cache
+CACHE_URL = os.environ.get('CACHE_URL')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Seconds a meeting access check (host or participant) stays cached; only
+# cached with CACHE_URL, as a per-process cache misses other workers' invalidations
+MEETING_ACCESS_CACHE_TIMEOUT = int(os.environ.get('MEETING_ACCESS_CACHE_TIMEOUT', 300))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -214,11 +239,91 @@ CORS_ALLOW_ALL_ORIGINS = True  # Change this in production
 CORS_ALLOW_CREDENTIALS = True
 
 # Channels
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer'
+# CHANNEL_LAYER selects the backend:
+#   memory         - InMemoryChannelLayer, single process only (development/tests)
+#   redis          - RedisChannelLayer over REDIS_URL; several comma-separated
+#                    URLs shard channels and meeting groups by consistent hash
+#   redis-sentinel - RedisChannelLayer over Sentinel; one shard per master
+#                    name in REDIS_SENTINEL_MASTERS
+CHANNEL_LAYER = os.environ.get('CHANNEL_LAYER', 'memory')
+CHANNEL_LAYER_CAPACITY = int(os.environ.get('CHANNEL_LAYER_CAPACITY', 100))
+CHANNEL_LAYER_EXPIRY = int(os.environ.get('CHANNEL_LAYER_EXPIRY', 60))
+
+if CHANNEL_LAYER == 'redis':
+    CHANNEL_LAYER_HOSTS = [
+        url.strip()
+        for url in os.environ.get('REDIS_URL', 'redis://localhost:6379/0').split(',')
+        if url.strip()
+    ]
+elif CHANNEL_LAYER == 'redis-sentinel':
+    REDIS_SENTINELS = [
+        (host, int(port))
+        for host, port in (
+            address.strip().rsplit(':', 1)
+            for address in os.environ.get('REDIS_SENTINELS', 'localhost:26379').split(',')
+            if address.strip()
+        )
+    ]
+    CHANNEL_LAYER_HOSTS = [
+        {
+            'sentinels': REDIS_SENTINELS,
+            'master_name': master_name.strip(),
+            'password': os.environ.get('REDIS_PASSWORD') or None,
+        }
+        for master_name in os.environ.get('REDIS_SENTINEL_MASTERS', 'mymaster').split(',')
+        if master_name.strip()
+    ]
+elif CHANNEL_LAYER != 'memory':
+    raise ValueError(f'Unknown CHANNEL_LAYER {CHANNEL_LAYER!r}, expected memory, redis or redis-sentinel')
+
+if CHANNEL_LAYER == 'memory':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+            'CONFIG': {
+                'capacity': CHANNEL_LAYER_CAPACITY,
+                'expiry': CHANNEL_LAYER_EXPIRY,
+            },
+        }
     }
-}
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': CHANNEL_LAYER_HOSTS,
+                'prefix': os.environ.get('CHANNEL_LAYER_PREFIX', 'unio'),
+                'capacity': CHANNEL_LAYER_CAPACITY,
+                'expiry': CHANNEL_LAYER_EXPIRY,
+            },
+        }
+    }
+
+# WebRTC signaling
+# ICE candidates from one sender to one target are coalesced for up to
+# SIGNALING_ICE_BATCH_WINDOW seconds or SIGNALING_ICE_BATCH_SIZE candidates
+# and delivered as a single event. A window of 0 disables batching.
+SIGNALING_ICE_BATCH_WINDOW = float(os.environ.get('SIGNALING_ICE_BATCH_WINDOW', 0.02))
+SIGNALING_ICE_BATCH_SIZE = int(os.environ.get('SIGNALING_ICE_BATCH_SIZE', 20))
+
+# Signaling rate limits (offer/answer/ice-candidate messages per second and
+# burst size) per connection and per meeting; a rate of 0 disables the limit.
+# Meeting buckets are per process ('local') or shared through the Redis
+# channel layer ('redis').
+SIGNALING_CONNECTION_RATE = float(os.environ.get('SIGNALING_CONNECTION_RATE', 50))
+SIGNALING_CONNECTION_BURST = int(os.environ.get('SIGNALING_CONNECTION_BURST', 100))
+SIGNALING_ROOM_RATE = float(os.environ.get('SIGNALING_ROOM_RATE', 500))
+SIGNALING_ROOM_BURST = int(os.environ.get('SIGNALING_ROOM_BURST', 1000))
+SIGNALING_RATE_LIMIT_BACKEND = os.environ.get('SIGNALING_RATE_LIMIT_BACKEND', 'local')
+
+# Maximum frames queued for a WebSocket client before lower-priority or
+# older frames are dropped
+WEBSOCKET_SEND_QUEUE_SIZE = int(os.environ.get('WEBSOCKET_SEND_QUEUE_SIZE', 256))
+
+# Meeting presence: clients that heartbeat do so every PRESENCE_HEARTBEAT_INTERVAL
+# seconds, and are disconnected after PRESENCE_TIMEOUT seconds of silence
+PRESENCE_HEARTBEAT_INTERVAL = int(os.environ.get('PRESENCE_HEARTBEAT_INTERVAL', 15))
+PRESENCE_TIMEOUT = int(os.environ.get('PRESENCE_TIMEOUT', 45))
 
 # Google OAuth2 Settings
 GOOGLE_OAUTH2_CLIENT_ID = os.environ.get('GOOGLE_OAUTH2_CLIENT_ID', '')
@@ -231,6 +336,43 @@ MICROSOFT_OAUTH2_CLIENT_SECRET = os.environ.get('MICROSOFT_OAUTH2_CLIENT_SECRET'
 # File Upload Settings
 MAX_UPLOAD_SIZE = 52428800  # 50MB
 ALLOWED_UPLOAD_EXTENSIONS = ['.pdf', '.doc', '.docx', '.txt', '.png', '.jpg', '.jpeg', '.gif']
+# Resumable uploads: largest chunk accepted per PUT, and hours after which
+# unfinished uploads are removed by the clean_uploads command
+UPLOAD_CHUNK_MAX_SIZE = int(os.environ.get('UPLOAD_CHUNK_MAX_SIZE', 8388608))  # 8MB
+UPLOAD_EXPIRE_HOURS = int(os.environ.get('UPLOAD_EXPIRE_HOURS', 24))
+# Shared file downloads: 'python' streams them through Django; behind nginx use
+# 'x-accel-redirect' (served from the internal FILE_DOWNLOAD_ACCEL_PREFIX
+# location), behind Apache mod_xsendfile or lighttpd use 'x-sendfile'
+FILE_DOWNLOAD_MODE = os.environ.get('FILE_DOWNLOAD_MODE', 'python')
+FILE_DOWNLOAD_ACCEL_PREFIX = os.environ.get('FILE_DOWNLOAD_ACCEL_PREFIX', '/protected-media/')
+# Directories of MEDIA_ROOT holding shared files and their thumbnails, never
+# served from MEDIA_URL: only the access-checked download views send them
+# (see nginx.conf)
+PRIVATE_MEDIA_DIRS = ['meeting_files', 'blobs', 'thumbnails', 'partial_uploads']
+# Shared images and PDFs get thumbnails of at most THUMBNAIL_SIZE pixels, rendered
+# by THUMBNAIL_WORKERS background processes (0 renders them inline). Images of
+# more than THUMBNAIL_MAX_PIXELS pixels get none, bounding a render's memory
+THUMBNAIL_SIZE = int(os.environ.get('THUMBNAIL_SIZE', 320))
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', 2))
+THUMBNAIL_MAX_PIXELS = int(os.environ.get('THUMBNAIL_MAX_PIXELS', 50000000))
+
+# Chat Settings
+# Messages per chat history page (clients may ask for up to the maximum)
+CHAT_HISTORY_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_PAGE_SIZE', 50))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.environ.get('CHAT_HISTORY_MAX_PAGE_SIZE', 200))
+# Chat messages sent over the meeting socket are written in one bulk insert
+# every CHAT_PERSIST_INTERVAL seconds or once CHAT_PERSIST_BATCH_SIZE are pending
+CHAT_PERSIST_INTERVAL = float(os.environ.get('CHAT_PERSIST_INTERVAL', 0.01))
+CHAT_PERSIST_BATCH_SIZE = int(os.environ.get('CHAT_PERSIST_BATCH_SIZE', 100))
+# Inserts tried for a batch of socket chat messages before it is dropped
+CHAT_PERSIST_ATTEMPTS = int(os.environ.get('CHAT_PERSIST_ATTEMPTS', 5))
+# Most messages accepted by one bulk send request
+CHAT_BULK_MAX_MESSAGES = int(os.environ.get('CHAT_BULK_MAX_MESSAGES', 500))
+# Unread chat counts stop at this value
+CHAT_UNREAD_COUNT_LIMIT = int(os.environ.get('CHAT_UNREAD_COUNT_LIMIT', 1000))
+# archive_chat moves the chat of completed meetings scheduled more than this
+# many days ago into compressed archives
+CHAT_ARCHIVE_AFTER_DAYS = int(os.environ.get('CHAT_ARCHIVE_AFTER_DAYS', 30))
 
 # Security Settings (for production)
 SECURE_SSL_REDIRECT = False  # Set to True in production
@@ -5,9 +5,11 @@ from django.contrib import admin
 from django.urls import path, include, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.http import Http404
 from rest_framework import permissions
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
+import re
 
 # Swagger/OpenAPI schema configuration
 schema_view = get_schema_view(
@@ -62,4 +64,12 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # Shared files are only sent by the chat download views, after an access check
+    def private_media(request):
+        raise Http404
+
+    urlpatterns += [re_path(
+        rf'^{re.escape(settings.MEDIA_URL.lstrip("/"))}(?:{"|".join(settings.PRIVATE_MEDIA_DIRS)})/',
+        private_media
+    )]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)